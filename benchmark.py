@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugin.video.zalukaj"))
+
+from resources.lib import zalukaj  # noqa: E402
+from resources.lib.fixtures import FixtureServer  # noqa: E402
+from resources.lib.workers import RateLimiter  # noqa: E402
+from resources.lib.zalukaj import Zalukaj  # noqa: E402
+from resources.lib.zalukaj_async import AsyncZalukaj  # noqa: E402
+
+
+def crawl_sync(client, links):
+    return [client.fetch_tv_series_episodes_list(link) for link in links]
+
+
+def crawl_async(client, links):
+    return client.fetch_many('fetch_tv_series_episodes_list', links)
+
+
+def measure(name, crawl, client, links):
+    start = time.time()
+    crawl(client, links)
+    elapsed = time.time() - start
+    return {'name': name, 'requests': len(links), 'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(links) / elapsed, 1)}
+
+
+def measure_home(name, items):
+    """
+    :param items: function - returns iterable of tv series from home page
+    """
+    start = time.time()
+    first_item = None
+    count = 0
+    for _ in items():
+        first_item = first_item or time.time() - start
+        count += 1
+
+    return {'name': name, 'items': count, 'first_item_seconds': round(first_item, 4),
+            'seconds': round(time.time() - start, 4)}
+
+
+def benchmark_home(latency, padding):
+    """
+    Compare buffered BeautifulSoup parse of home page with streaming tv series menu parser.
+    """
+    with FixtureServer(latency=latency) as server:
+        server.home_padding = padding
+        zalukaj.URL = server.url
+        client = Zalukaj(tempfile.mkdtemp())
+
+        def buffered():
+            return client._get(zalukaj.URL).select('div#two table#main_menu a')
+
+        page_size = len(client.session.get(server.url).content)
+        results = [measure_home('buffered', buffered), measure_home('streaming', client.iter_tv_series_list)]
+
+    return {'latency': latency, 'page_bytes': page_size, 'results': results}
+
+
+def benchmark(latency, workers, requests):
+    """
+    Crawl episodes lists from local stand-in using synchronous and concurrent client.
+    """
+    with FixtureServer(latency=latency) as server:
+        zalukaj.URL = server.url
+        data_path = tempfile.mkdtemp()
+        sync_client = Zalukaj(data_path)
+        async_client = AsyncZalukaj(Zalukaj(data_path, limiter=RateLimiter(concurrency=workers)), workers=workers)
+
+        seasons = [season['url']
+                   for item in sync_client.fetch_tv_series_list()
+                   for season in sync_client.fetch_tv_series_seasons_list(item['url'])]
+        links = [seasons[i % len(seasons)] for i in range(requests)]
+
+        results = [measure('sync', crawl_sync, sync_client, links),
+                   measure('async', crawl_async, async_client, links)]
+        stats = async_client.client.stats
+        async_client.close()
+
+    # Repeated links requested at the same time are coalesced into one request by async client
+    return {'latency': latency, 'workers': workers, 'results': results, 'async_stats': stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Zalukaj and AsyncZalukaj throughput and home page parsing "
+                                                 "on local stand-in.")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency in seconds")
+    parser.add_argument("--workers", type=int, default=100, help="number of concurrent requests")
+    parser.add_argument("--requests", type=int, default=300, help="number of requests per client")
+    parser.add_argument("--home-padding", type=int, default=20000, help="number of dummy rows added to home page")
+    args = parser.parse_args()
+
+    print(json.dumps({'crawl': benchmark(args.latency, args.workers, args.requests),
+                      'home': benchmark_home(args.latency, args.home_padding)}, indent=2))
@@ -1,19 +1,191 @@
+import argparse
+import compileall
+import hashlib
+import io
+import json
+import os
 import re
 import shutil
+import subprocess
 import sys
+import tempfile
+import zipfile
 
 package = "plugin.video.zalukaj"
 
+""" Files of source tree not shipped in package """
+EXCLUDED = shutil.ignore_patterns("*_test.py", "fixtures", "vendor", "*.py[co]", "__pycache__")
 
-def make_package(ver):
-    shutil.make_archive("dist/{}-{}".format(package, ver), 'zip', base_dir=package)
+""" Directory inside package with bundled dependencies, added to sys.path by resources/lib/__init__.py """
+VENDOR_DIR = os.path.join("resources", "lib", "vendor")
+
+""" Vendored packages with the only files needed by plugin, BeautifulSoup is used with html.parser builder only """
+VENDOR_FILES = {
+    "bs4": ["__init__.py", "dammit.py", "element.py", os.path.join("builder", "__init__.py"),
+            os.path.join("builder", "_htmlparser.py")],
+}
+
+""" Kodi add-ons providing vendored packages, removed from requirements in addon.xml """
+VENDOR_ADDONS = {
+    "bs4": "script.module.beautifulsoup4",
+}
+
+""" Entry point scripts of add-on, importing them runs plugin, so module they start is measured instead """
+ENTRY_POINTS = {
+    "main": "resources.lib.plugin",
+}
+
+""" Source files modification time, zip keeps time with 2 seconds precision, so compiled files stay valid """
+SOURCE_MTIME = 946684800
+
+""" Measures import time of single module in fresh interpreter, with fake Kodi modules """
+IMPORT_TIMER = """
+import imp, sys, time
+sys.path[0:0] = {paths!r}
+kodi = imp.load_source('kodi_fakes', {kodi!r})
+kodi.install({profile!r})
+start = time.time()
+__import__({module!r})
+sys.stdout.write(repr(time.time() - start))
+"""
+
+
+def vendor(build_path):
+    for name, files in VENDOR_FILES.items():
+        source = os.path.dirname(__import__(name).__file__)
+        for path in files:
+            target = os.path.join(build_path, VENDOR_DIR, name, path)
+            if not os.path.isdir(os.path.dirname(target)):
+                os.makedirs(os.path.dirname(target))
+            shutil.copy(os.path.join(source, path), target)
+
+    with io.open(os.path.join(build_path, "addon.xml"), encoding="utf-8", newline="") as handle:
+        addon = handle.read()
+
+    for name in VENDOR_FILES:
+        addon = re.sub(u'[ \t]*<import addon="{}"[^>]*/>\r?\n'.format(re.escape(VENDOR_ADDONS[name])), '', addon)
+
+    with io.open(os.path.join(build_path, "addon.xml"), "w", encoding="utf-8", newline="") as handle:
+        handle.write(addon)
+    with io.open(os.path.join(build_path, "addon.xml.md5"), "w", encoding="utf-8") as handle:
+        handle.write(u"{}".format(hashlib.md5(addon.encode("utf-8")).hexdigest()))
+
+
+def compile_modules(build_path):
+    """
+    Compile all modules except main.py, which Kodi does not cache anyway.
+    Compiled files match interpreter running this script, other interpreters fall back to source.
+    """
+    for root, _, files in os.walk(build_path):
+        for name in files:
+            os.utime(os.path.join(root, name), (SOURCE_MTIME, SOURCE_MTIME))
+
+    if not compileall.compile_dir(build_path, quiet=1, rx=re.compile(r"[/\\]main\.py$")):
+        raise RuntimeError("Compilation of {} failed".format(build_path))
+
+
+def module_name(path):
+    """
+    :param path: string - path of file inside zip
+    :return: string | None - dotted name of module, None for not python files
+    """
+    match = re.match(r"^{}/(?:{}/)?(.+?)(?:/__init__)?\.py[co]?$".format(
+        re.escape(package), re.escape(VENDOR_DIR.replace(os.sep, "/"))), path)
+    return match.group(1).replace("/", ".") if match else None
+
+
+def import_time(build_path, module, runs):
+    """
+    :return: float - the best of runs import times in seconds, including imports of module dependencies
+    """
+    profile = tempfile.mkdtemp()
+    try:
+        script = IMPORT_TIMER.format(paths=[build_path, os.path.join(build_path, VENDOR_DIR)], profile=profile,
+                                     kodi=os.path.join(os.path.dirname(os.path.abspath(__file__)), package,
+                                                       "resources", "lib", "fixtures", "kodi.py"),
+                                     module=module)
+        return min(float(subprocess.check_output([sys.executable, "-B", "-c", script], cwd=profile))
+                   for _ in range(runs))
+    finally:
+        shutil.rmtree(profile)
+
+
+def report(archive, runs):
+    """
+    Size and import time of every module in built package.
+
+    :param archive: string - path to zip file
+    :param runs: int - number of import time measurements of every module
+    :return: dict
+    """
+    modules = {}
+    with zipfile.ZipFile(archive) as zip_file:
+        for info in zip_file.infolist():
+            name = module_name(info.filename)
+            if name:
+                module = modules.setdefault(name, {'module': name, 'source_size': 0, 'compiled_size': 0,
+                                                   'zip_size': 0})
+                module['compiled_size' if info.filename.endswith(('.pyc', '.pyo')) else 'source_size'] += \
+                    info.file_size
+                module['zip_size'] += info.compress_size
+
+        build_path = tempfile.mkdtemp()
+        try:
+            zip_file.extractall(build_path)
+            for module in modules.values():
+                module['import_ms'] = round(import_time(os.path.join(build_path, package),
+                                                        ENTRY_POINTS.get(module['module'], module['module']),
+                                                        runs) * 1000, 2)
+        finally:
+            shutil.rmtree(build_path)
+
+    return {
+        'package': os.path.basename(archive),
+        'python': sys.version.split()[0],
+        'zip_size': os.path.getsize(archive),
+        'modules': sorted(modules.values(), key=lambda module: module['module']),
+    }
+
+
+def make_package(ver, vendored=False, import_runs=3):
+    """
+    Build package zip from source in `plugin.video.zalukaj`, without tests and fixtures and with compiled modules,
+    and write its report next to it.
+
+    :param ver: string - version used in file name
+    :param vendored: bool - bundle trimmed dependencies instead of requiring them from Kodi
+    :param import_runs: int - number of import time measurements of every module, 0 to skip report
+    :return: string - path to zip file
+    """
+    build_root = tempfile.mkdtemp()
+    try:
+        build_path = os.path.join(build_root, package)
+        shutil.copytree(package, build_path, ignore=EXCLUDED)
+        if vendored:
+            vendor(build_path)
+        compile_modules(build_path)
+
+        archive = shutil.make_archive("dist/{}-{}".format(package, ver), 'zip', root_dir=build_root, base_dir=package)
+    finally:
+        shutil.rmtree(build_root)
+
+    if import_runs:
+        with open("dist/{}-{}-report.json".format(package, ver), "w") as handle:
+            handle.write(json.dumps(report(archive, import_runs), indent=2, sort_keys=True) + "\n")
+
+    return archive
 
 
 if __name__ == "__main__":
-    version = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Create Kodi package zip in dist directory.")
+    parser.add_argument("version", help="package version, like 0.0.1")
+    parser.add_argument("--vendor", action="store_true", help="bundle trimmed BeautifulSoup into package")
+    parser.add_argument("--import-runs", type=int, default=3,
+                        help="import time measurements of every module in report, 0 to skip report")
+    args = parser.parse_args()
 
-    if bool(re.search("^[0-9]+.[0-9]+.[0-9]+$", version)):
-        make_package(version)
+    if bool(re.search("^[0-9]+.[0-9]+.[0-9]+$", args.version)):
+        make_package(args.version, args.vendor, args.import_runs)
         exit(0)
 
     exit(1)
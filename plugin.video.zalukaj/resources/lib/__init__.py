@@ -0,0 +1,8 @@
+import os
+import sys
+
+""" Directory with dependencies bundled into package by make_package.py --vendor """
+VENDOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendor")
+
+if os.path.isdir(VENDOR_PATH) and VENDOR_PATH not in sys.path:
+    sys.path.insert(0, VENDOR_PATH)
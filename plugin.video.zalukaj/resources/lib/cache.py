@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import threading
+import time
+
+from resources.lib import zalukaj
+from resources.lib.series_index import SeriesIndex
+
+""" Default seconds after which cached listing is refreshed, per listing kind """
+DEFAULT_FRESHNESS = {
+    'tv_series': 24 * 3600,
+    'seasons': 24 * 3600,
+    'episodes': 6 * 3600,
+    'categories': 7 * 24 * 3600,
+    'movies': 3600,
+}
+
+""" Default seconds after which cached listing is not served at all """
+DEFAULT_MAX_STALENESS = 30 * 24 * 3600
+
+""" Number of listings read from storage at once by dump """
+DUMP_BATCH = 200
+
+""" Maximum seconds plugin process waits at exit for background refreshes, unfinished ones are dropped """
+REFRESH_EXIT_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+
+class Listing(list):
+    """
+    List of items returned by CachedZalukaj.
+
+    stale: bool - True when items come from cache older than its freshness and refresh is running in background
+    fetched_at: float - time when items were fetched from service
+    """
+
+    def __init__(self, items, stale=False, fetched_at=None):
+        list.__init__(self, items)
+        self.stale = stale
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+
+class CachedZalukaj(object):
+    """
+    Zalukaj client serving listings stale-while-revalidate.
+
+    Fresh listing is returned from cache without network request. Listing older than its freshness, but not older
+    than maximum staleness, is returned immediately marked as stale and refreshed in background. When refresh fails,
+    for example because service is overloaded, stale listing stays in cache.
+    Methods not related to listings are passed to wrapped client.
+    """
+
+    def __init__(self, client, storage, ids, freshness=None, max_staleness=DEFAULT_MAX_STALENESS):
+        """
+        :param client: Zalukaj
+        :param storage: Storage
+        :param ids: IdMap - listings are stored under ids of their urls
+        :param freshness: dict - seconds of freshness per listing kind, missing kinds use DEFAULT_FRESHNESS
+        :param max_staleness: int - seconds after which cached listing is fetched again before it is returned
+        """
+        self.client = client
+        self.storage = storage
+        self.ids = ids
+        self.freshness = dict(DEFAULT_FRESHNESS, **(freshness or {}))
+        self.max_staleness = max_staleness
+        self.storage.schema('CREATE TABLE IF NOT EXISTS listings ('
+                            'kind TEXT NOT NULL, id TEXT NOT NULL, items TEXT NOT NULL, fetched_at REAL NOT NULL, '
+                            'PRIMARY KEY (kind, id))')
+        self._refreshing = {}
+        self._lock = threading.Lock()
+
+    def fetch_tv_series_list(self):
+        return self._fetch('tv_series', zalukaj.URL, self.client.fetch_tv_series_list)
+
+    def fetch_tv_series_index(self):
+        """
+        Sorted keys of index are stored next to tv series list, with the same fetch time, and are built again only
+        when the list was refreshed.
+
+        :return: SeriesIndex - index of tv series list
+        """
+        items = self.fetch_tv_series_list()
+        keys = self.get('tv_series_index', zalukaj.URL)
+        if keys is not None and keys.fetched_at == items.fetched_at:
+            return SeriesIndex(items, keys=keys, stale=items.stale)
+
+        index = SeriesIndex(items, stale=items.stale)
+        self.put('tv_series_index', zalukaj.URL, index.keys, fetched_at=items.fetched_at)
+        return index
+
+    def fetch_tv_series_seasons_list(self, link):
+        return self._fetch('seasons', link, self.client.fetch_tv_series_seasons_list, link)
+
+    def fetch_tv_series_episodes_list(self, link):
+        return self._fetch('episodes', link, self.client.fetch_tv_series_episodes_list, link)
+
+    def fetch_movie_categories_list(self):
+        return self._fetch('categories', zalukaj.URL, self.client.fetch_movie_categories_list)
+
+    def fetch_movies_list(self, link):
+        return self._fetch('movies', link, self.client.fetch_movies_list, link)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get(self, kind, link):
+        """
+        :return: Listing | None - cached listing regardless of its age
+        """
+        row = self.storage.fetch_one('SELECT items, fetched_at FROM listings WHERE kind = ? AND id = ?',
+                                     (kind, self.ids.id_for(link)))
+        return Listing(json.loads(row[0]), fetched_at=row[1]) if row else None
+
+    def put(self, kind, link, items, fetched_at=None):
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.storage.execute('INSERT OR REPLACE INTO listings (kind, id, items, fetched_at) VALUES (?, ?, ?, ?)',
+                             (kind, self.ids.id_for(link), json.dumps(items), fetched_at))
+        return Listing(items, fetched_at=fetched_at)
+
+    def dump(self, batch=DUMP_BATCH):
+        """
+        Read all cached listings, few at a time.
+
+        :return: generator of tuples (kind, url, items, fetched_at), items are JSON text
+        """
+        last = 0
+        while True:
+            rows = self.storage.fetch_all('SELECT listings.rowid, kind, url, items, fetched_at FROM listings '
+                                          'JOIN ids ON ids.id = listings.id WHERE listings.rowid > ? '
+                                          'ORDER BY listings.rowid LIMIT ?', (last, batch))
+            for row in rows:
+                yield row[1:]
+
+            if len(rows) < batch:
+                return
+
+            last = rows[-1][0]
+
+    def load(self, listings):
+        """
+        Store many listings in single transaction, cached listings fetched later than loaded ones are kept.
+
+        :param listings: list of tuples (kind, url, items, fetched_at), items are JSON text
+        :return: int - number of stored listings
+        """
+        self.ids.register([url for _, url, _, _ in listings])
+        rows = [(kind, self.ids.id_for(url), items, fetched_at) for kind, url, items, fetched_at in listings]
+        stored = 0
+        with self.storage.transaction() as cursor:
+            for kind, item_id, items, fetched_at in rows:
+                cursor.execute('INSERT OR REPLACE INTO listings (kind, id, items, fetched_at) SELECT ?, ?, ?, ? '
+                               'WHERE NOT EXISTS (SELECT 1 FROM listings '
+                               'WHERE kind = ? AND id = ? AND fetched_at >= ?)',
+                               (kind, item_id, items, fetched_at, kind, item_id, fetched_at))
+                stored += cursor.rowcount
+
+        return stored
+
+    def wait(self, timeout=None):
+        """
+        Wait for all background refreshes to finish.
+
+        :param timeout: float | None - maximum wait time in seconds for all refreshes together
+        :return: bool - True when no refresh is running anymore
+        """
+        with self._lock:
+            threads = list(self._refreshing.values())
+
+        deadline = time.time() + timeout if timeout is not None else None
+        for thread in threads:
+            thread.join(max(0, deadline - time.time()) if deadline is not None else None)
+
+        return not any(thread.is_alive() for thread in threads)
+
+    def _fetch(self, kind, link, fetch, *args):
+        cached = self.get(kind, link)
+        age = time.time() - cached.fetched_at if cached is not None else None
+
+        if cached is not None and age <= self.freshness[kind]:
+            return cached
+
+        if cached is not None and age <= self.max_staleness:
+            self._refresh(kind, link, fetch, *args)
+            cached.stale = True
+            return cached
+
+        return self.put(kind, link, fetch(*args))
+
+    def _refresh(self, kind, link, fetch, *args):
+        """
+        Start background refresh of listing, unless it is already running.
+        Thread is daemon, so it does not keep Kodi's interpreter alive; plugin waits for it at most
+        REFRESH_EXIT_TIMEOUT seconds (see `wait`) and refresh which did not finish is dropped, listing stays stale.
+        """
+
+        def refresh():
+            try:
+                self.put(kind, link, fetch(*args))
+            except Exception as e:  # service overload, timeout or any other problem, stale listing is still valid
+                logger.warning("Refresh of %s %s failed, stale listing is kept: %s", kind, link, e)
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+
+        key = (kind, link)
+        with self._lock:
+            if key in self._refreshing:
+                return
+
+            thread = threading.Thread(target=refresh, name='zalukaj-refresh')
+            thread.daemon = True
+            self._refreshing[key] = thread
+
+        thread.start()
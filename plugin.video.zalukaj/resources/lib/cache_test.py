@@ -0,0 +1,96 @@
+import time
+import unittest
+
+import mock
+from resources.lib import zalukaj
+from resources.lib.cache import CachedZalukaj
+from resources.lib.fixtures import FixtureTestCase, corpus
+from resources.lib.ids import IdMap
+from resources.lib.storage import Storage
+from resources.lib.zalukaj import Zalukaj
+
+
+class TestCachedZalukaj(FixtureTestCase):
+
+    def setUp(self):
+        super(TestCachedZalukaj, self).setUp()
+        self.data_path = self.mkdtemp()
+        self.storage = Storage(self.data_path)
+        self.cache = CachedZalukaj(Zalukaj(self.data_path), self.storage, IdMap(self.storage),
+                                   freshness={'episodes': 60}, max_staleness=3600)
+        self.link = corpus.season_url(500, corpus.series()[0][1], 1)
+
+    def tearDown(self):
+        self.cache.wait()
+        self.server.overloaded = False
+        self.storage.close()
+
+    def test_fresh_listing_is_served_without_request(self):
+        items = self.cache.fetch_tv_series_episodes_list(self.link)
+        self.assertEqual(len(items), corpus.EPISODES)
+        self.assertFalse(items.stale)
+
+        del self.server.requests[:]
+        self.assertEqual(self.cache.fetch_tv_series_episodes_list(self.link), items)
+        self.assertEqual(self.server.requests, [])
+
+    def test_stale_listing_is_served_and_refreshed(self):
+        self.cache.put('episodes', self.link, [{'url': '/old', 'title': 'Old'}], fetched_at=time.time() - 120)
+
+        items = self.cache.fetch_tv_series_episodes_list(self.link)
+        self.assertTrue(items.stale)
+        self.assertEqual(items[0]['url'], '/old')
+
+        self.cache.wait()
+        refreshed = self.cache.fetch_tv_series_episodes_list(self.link)
+        self.assertFalse(refreshed.stale)
+        self.assertEqual(len(refreshed), corpus.EPISODES)
+
+    def test_wait_for_refresh_is_bounded(self):
+        self.cache.put('episodes', self.link, [{'url': '/old', 'title': 'Old'}], fetched_at=time.time() - 120)
+        self.server.latency = 0.5
+
+        self.assertTrue(self.cache.fetch_tv_series_episodes_list(self.link).stale)
+        self.assertTrue(all(thread.daemon for thread in self.cache._refreshing.values()))
+        started = time.time()
+        self.assertFalse(self.cache.wait(0.1))
+        self.assertLess(time.time() - started, 0.4)
+        self.assertTrue(self.cache.wait())
+
+    def test_failed_refresh_keeps_stale_listing(self):
+        fetched_at = time.time() - 120
+        self.cache.put('episodes', self.link, [{'url': '/old', 'title': 'Old'}], fetched_at=fetched_at)
+        self.server.overloaded = True
+
+        self.assertTrue(self.cache.fetch_tv_series_episodes_list(self.link).stale)
+        self.cache.wait()
+        self.assertEqual(len(self.server.requests), 1)
+
+        cached = self.cache.get('episodes', self.link)
+        self.assertEqual(cached[0]['url'], '/old')
+        self.assertEqual(cached.fetched_at, fetched_at)
+
+    def test_listing_older_than_max_staleness_is_fetched(self):
+        self.cache.put('episodes', self.link, [{'url': '/old', 'title': 'Old'}], fetched_at=time.time() - 7200)
+
+        items = self.cache.fetch_tv_series_episodes_list(self.link)
+        self.assertFalse(items.stale)
+        self.assertEqual(len(items), corpus.EPISODES)
+
+    def test_tv_series_index_is_stored_with_list(self):
+        index = self.cache.fetch_tv_series_index()
+        self.assertEqual(len(index), len(corpus.SERIES_NAMES))
+        self.assertEqual(self.cache.get('tv_series_index', zalukaj.URL), index.keys)
+
+        with mock.patch('resources.lib.series_index.normalize', side_effect=AssertionError):
+            self.assertEqual(self.cache.fetch_tv_series_index().letters(), index.letters())
+
+        self.cache.put('tv_series', zalukaj.URL, [{'url': '/serial/a-1.html', 'title': u'Alf'}])
+        self.assertEqual(self.cache.fetch_tv_series_index().letters(), [(u'A', 1)])
+
+    def test_other_methods_are_passed_to_client(self):
+        self.assertEqual(len(self.cache.search_movies(corpus.MOVIES[0][1])), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
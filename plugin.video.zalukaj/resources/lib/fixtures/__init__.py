@@ -0,0 +1,2 @@
+from resources.lib.fixtures.server import FixtureServer
+from resources.lib.fixtures.testcase import FixtureTestCase
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Offline copy of zalukaj.com markup.
+Pages are rendered from small data tables below, so every selector used by Zalukaj client is covered.
+All links are relative or prefixed with base url of the server rendering them.
+"""
+from __future__ import unicode_literals
+
+import re
+from cgi import escape
+
+SERIES_NAMES = [
+    'Simpsonowie', 'Futurama', 'Gra o Tron', 'Ślepnąc od świateł', 'Żywioł', 'Ojciec Mateusz', 'Breaking Bad',
+    'Czarne lustro', 'Dom z papieru', 'Ekipa', 'Łowcy skarbów', 'Nowa', 'Przyjaciele', 'Rodzina zastępcza',
+    'Stranger Things', '1983', 'Wiedźmin', 'Xena', 'Ucho Prezesa', 'Kiepscy', 'Mr. Robot', 'Ania, nie Anna',
+]
+
+GENRES = [
+    (22, 'Akcja'),
+    (23, 'Animacja'),
+    (24, 'Komedia'),
+    (25, 'Dramat'),
+    (26, 'Horror'),
+]
+
+MOVIES = [
+    (1001, 'Futurama: Bender\'s Game', 2008, 'Pościg przez kosmos.', [23, 24]),
+    (1002, 'Szybcy i wściekli', 2001, 'Wyścigi uliczne.', [22]),
+    (1003, 'Shrek', 2001, 'Ogr i osioł.', [23, 24]),
+    (1004, 'Pianista', 2002, 'Wojenna historia.', [25]),
+    (1005, 'Obecność', 2013, 'Nawiedzony dom.', [26]),
+    (1006, 'Mad Max: Na drodze gniewu', 2015, 'Pustynia i pościg.', [22, 25]),
+    (1007, 'Dzień świra', 2002, 'Jeden dzień z życia.', [24, 25]),
+    (1008, 'Toy Story', 1995, 'Zabawki ożywają.', [23]),
+    (1009, 'To', 2017, 'Klaun w kanałach.', [26, 25]),
+    (1010, 'Kiler', 1997, 'Pomyłka taksówkarza.', [24, 22]),
+    (1011, 'Gladiator', 2000, 'Arena w Rzymie.', [22, 25]),
+    (1012, 'Coco', 2017, 'Święto zmarłych.', [23]),
+]
+
+""" Number of movies displayed on single genre page """
+MOVIES_PER_PAGE = 4
+
+""" Number of seasons and episodes generated for every tv series """
+SEASONS = 2
+EPISODES = 3
+
+VERSIONS = ['Lektor', 'Napisy PL']
+QUALITIES = ['720p', '480p']
+
+USER_NAME = 'tester'
+
+
+def slugify(text, separator='-'):
+    table = dict(zip('ąćęłńóśźż', 'acelnoszz'))
+    text = ''.join(table.get(char, char) for char in text.lower())
+    return re.sub('[^a-z0-9]+', separator, text).strip(separator)
+
+
+def series():
+    """
+    :return: list of tuples (id, slug, title)
+    """
+    return [(500 + i, slugify(name), name) for i, name in enumerate(SERIES_NAMES)]
+
+
+def series_url(series_id, slug):
+    return '/serial/{}-{}.html'.format(slug, series_id)
+
+
+def season_url(series_id, slug, season):
+    return '/kategoria-serialu/{}{},1/{}_sezon_{}/'.format(series_id, season, slugify(slug, '_'), season)
+
+
+def episode_url(base, series_id, slug, season, episode):
+    return '{}/serial-online/{}{}{:02d}/{}-s{:02d}e{:02d}.html'.format(
+        base, series_id, season, episode, slug, season, episode)
+
+
+def movie_url(base, movie_id, title):
+    return '{}/zalukaj-film/{}/{}.html'.format(base, movie_id, slugify(title))
+
+
+def genre_page_url(genre_id, page):
+    return '/gatunek,{}/ostatnio-dodane,wszystkie,strona-{}'.format(genre_id, page)
+
+
+def layout(title, body):
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>{}</title></head>'
+            '<body><div id="header"><a href="/">zalukaj</a></div>{}'
+            '<div id="footer">zalukaj.com</div></body></html>').format(escape(title), body)
+
+
+def render_home(base, padding=0):
+    """
+    :param padding: int - number of dummy menu rows added after series menu, used to make page heavy
+    """
+    genres = ''.join('<td><a href="/gatunek/{}">{}</a></td>'.format(genre_id, escape(name))
+                     for genre_id, name in GENRES)
+    menu = ''.join('<tr><td><a href="{}" title="{}">{}</a></td></tr>'.format(
+        series_url(series_id, slug), escape(title, True), escape(title)) for series_id, slug, title in series())
+    filler = ''.join('<div class="news"><p>Nowość numer {}</p></div>'.format(i) for i in range(padding))
+
+    return layout('Zalukaj', (
+        '<form id="login"><input type="text" name="username"><input type="hidden" name="hash" value="fixture">'
+        '</form>'
+        '<table id="one"><tr>{}</tr></table>'
+        '<div id="two"><table id="main_menu">{}</table></div>'
+        '<div id="three">{}</div>'
+    ).format(genres, menu, filler))
+
+
+def render_series(base, series_id):
+    for current_id, slug, title in series():
+        if current_id == series_id:
+            seasons = ''.join('<a class="sezon" href="{}">{} Sezon: {}</a>'.format(
+                season_url(series_id, slug, season), escape(title), season) for season in range(1, SEASONS + 1))
+            return layout(title, (
+                '<div class="blok2"><div><img src="/promote_serial/{}.jpg"></div></div>'
+                '<div id="sezony">{}</div>'
+            ).format(series_id, seasons))
+
+    return None
+
+
+def render_season(base, series_id, season):
+    for current_id, slug, title in series():
+        if current_id == series_id:
+            episodes = ''.join((
+                '<div><a href="{}">{} odcinek {}</a><span class="vinfo">S{:02d}E{:02d}</span></div>'
+            ).format(episode_url(base, series_id, slug, season, episode), escape(title), episode, season, episode)
+                for episode in range(1, EPISODES + 1))
+            return layout(title, (
+                '<div class="blok2"><div><img src="/promote_serial/{}.jpg"></div></div>'
+                '<div class="odcinkicat">{}</div>'
+            ).format(series_id, episodes))
+
+    return None
+
+
+def render_genre(base, genre_id, page):
+    movies = [movie for movie in MOVIES if genre_id in movie[4]]
+    pages = max(1, (len(movies) + MOVIES_PER_PAGE - 1) // MOVIES_PER_PAGE)
+    if page > pages:
+        return None
+
+    navigation = ''.join(
+        '<span class="pc_current">{}</span>'.format(number) if number == page else
+        '<a href="{}">{}</a>'.format(genre_page_url(genre_id, number), number)
+        for number in range(1, pages + 1))
+
+    items = ''.join((
+        '<div class="tivief4">'
+        '<div class="im23jf" style="background-image:url(/promote/{}.jpg);"><p><span>{}</span></p></div>'
+        '<div class="rmk23m4"><h3><a href="{}" title="{}">{}</a></h3><div>{}</div></div>'
+        '</div>'
+    ).format(movie_id, year, movie_url(base, movie_id, title), escape(title, True), escape(title), escape(plot))
+        for movie_id, title, year, plot, _ in movies[(page - 1) * MOVIES_PER_PAGE:page * MOVIES_PER_PAGE])
+
+    return layout('Gatunek', '<div class="categories_page">{}</div><div id="index_content">{}</div>'.format(
+        navigation, items))
+
+
+def render_search(base, phrase):
+    phrase = phrase.lower()
+    rows = []
+    for movie_id, title, year, plot, _ in MOVIES:
+        if phrase in title.lower():
+            rows.append((movie_url(base, movie_id, title), '{}/promote/{}.jpg'.format(base, movie_id), title,
+                         '{} | film'.format(year), plot))
+
+    for series_id, slug, title in series():
+        if phrase in title.lower():
+            rows.append((series_url(series_id, slug), '{}/promote_serial/{}.jpg'.format(base, series_id), title,
+                         'serial', ''))
+
+    return ''.join((
+        '<div class="row"><div class="thumb"><img src="{}"></div>'
+        '<div class="details"><div class="title"><a href="{}" title="{}">{}</a></div><div class="gen">{}</div></div>'
+        '<div class="desc">{}</div></div>'
+    ).format(img, link, escape(title, True), escape(title), escape(genre), escape(plot))
+        for link, img, title, genre, plot in rows)
+
+
+def render_movie(base, movie_id):
+    return layout('Film', '<div id="player"><iframe src="/player.php?w={}"></iframe></div>'.format(movie_id))
+
+
+def stream_url(base, movie_id, version, quality):
+    return '{}/stream/{}-{}-{}.mp4'.format(base, movie_id, version, quality)
+
+
+def render_player(base, movie_id, version=0):
+    versions = ''.join('<a href="/player.php?w={}&amp;v={}">{}</a>'.format(movie_id, index, escape(name))
+                       for index, name in enumerate(VERSIONS))
+    sources = ''.join('<source src="{}" label="{}" type="video/mp4">'.format(
+        stream_url(base, movie_id, version, quality), quality) for quality in QUALITIES)
+
+    return layout('Player', '<div id="buttonsPL">{}</div><video>{}</video>'.format(versions, sources))
+
+
+def render_user(logged):
+    if not logged:
+        return '<div></div><div></div><div><p>Zaloguj się</p></div>'
+
+    return ('<div><a href="#" style="text-decoration:underline;">{}</a></div><div></div>'
+            '<div><p><a href="/konto">Konto VIP</a></p></div>').format(USER_NAME)
+
+
+def render_overload():
+    return layout('Duze obciazenie!', '<h1>Duze obciazenie!</h1>')
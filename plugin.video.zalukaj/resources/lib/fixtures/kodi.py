@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Fake Kodi modules (xbmc, xbmcgui, xbmcplugin, xbmcaddon, xbmcvfs) and script.module.routing,
+allowing plugin routes to be imported and called outside of Kodi.
+
+Everything plugin sends to Kodi is recorded in `events` list as tuples (time, name, details).
+"""
+import os
+import re
+import sys
+import time
+import types
+
+ADDON_ID = 'plugin.video.zalukaj'
+
+events = []
+
+""" Values returned by Kodi api, change them to drive plugin """
+state = {
+    'profile': '',
+    'settings': {},
+    'input': '',
+    'select': 0,
+    'browse': '',
+}
+
+
+def record(name, **details):
+    events.append((time.time(), name, details))
+
+
+def last_event(*names):
+    """
+    :return: tuple | None - last recorded event with one of given names
+    """
+    for event in reversed(events):
+        if event[1] in names:
+            return event
+
+    return None
+
+
+# xbmcaddon
+
+class Addon(object):
+    def __init__(self, addon_id=ADDON_ID):
+        self.addon_id = addon_id
+
+    def getAddonInfo(self, key):
+        return {'id': self.addon_id, 'profile': state['profile'], 'icon': '', 'version': ''}.get(key, '')
+
+    def getSetting(self, setting):
+        return str(state['settings'].get(setting, ''))
+
+    def setSetting(self, setting, value):
+        state['settings'][setting] = value
+
+    def getLocalizedString(self, string_id):
+        return u''
+
+    def openSettings(self):
+        record('openSettings')
+
+
+# xbmc
+
+def translate_path(path):
+    return path
+
+
+def log(message, level=0):
+    pass
+
+
+def execute_builtin(command, wait=False):
+    record('executebuiltin', command=command)
+
+
+def execute_json_rpc(data):
+    return '{"result": null}'
+
+
+# xbmcgui
+
+class ListItem(object):
+    def __init__(self, label='', label2='', path=''):
+        self.label = label
+        self.path = path
+        self.art = {}
+        self.info = {}
+        self.properties = {}
+        self.context_menu = []
+
+    def setArt(self, art):
+        self.art.update(art)
+
+    def setInfo(self, kind, info):
+        self.info.update(info)
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def addContextMenuItems(self, items, replaceItems=False):
+        self.context_menu.extend(items)
+
+
+class Dialog(object):
+    def ok(self, heading, *lines):
+        record('ok', heading=heading)
+        return True
+
+    def notification(self, heading, message, icon='', time=5000, sound=True):
+        record('notification', heading=heading, message=message)
+
+    def select(self, heading, items, autoclose=0, preselect=-1):
+        record('select', heading=heading, items=items)
+        return state['select']
+
+    def input(self, heading, defaultt='', type=0, option=0, autoclose=0):
+        record('input', heading=heading)
+        return state['input']
+
+    def browse(self, type, heading, shares, mask='', useThumbs=False, treatAsFolder=False, defaultt=''):
+        record('browse', heading=heading)
+        return state['browse']
+
+
+class DialogProgressBG(object):
+    def create(self, heading, message=''):
+        pass
+
+    def update(self, percent=0, heading='', message=''):
+        pass
+
+    def close(self):
+        pass
+
+
+# xbmcplugin
+
+def set_content(handle, content):
+    pass
+
+
+def add_directory_item(handle, url, listitem, isFolder=False, totalItems=0):
+    record('addDirectoryItem', url=url, item=listitem, folder=isFolder)
+    return True
+
+
+def end_of_directory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    record('endOfDirectory', succeeded=succeeded)
+
+
+def set_resolved_url(handle, succeeded, listitem):
+    record('setResolvedUrl', succeeded=succeeded, path=listitem.path)
+
+
+# xbmcvfs, local paths only
+
+class File(object):
+    def __init__(self, path, mode='r'):
+        self._handle = open(path, 'wb' if mode == 'w' else 'rb')
+
+    def read(self):
+        return self._handle.read()
+
+    def readBytes(self):
+        return bytearray(self._handle.read())
+
+    def write(self, data):
+        self._handle.write(data)
+        return True
+
+    def close(self):
+        self._handle.close()
+
+
+def vfs_exists(path):
+    return os.path.exists(path)
+
+
+def vfs_mkdirs(path):
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return True
+
+
+def vfs_delete(path):
+    os.remove(path)
+    return True
+
+
+def vfs_rename(source, target):
+    os.rename(source, target)
+    return True
+
+
+# routing
+
+class Plugin(object):
+    def __init__(self, base_url=None):
+        self.base_url = base_url or 'plugin://{}'.format(ADDON_ID)
+        self.handle = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else -1
+        self.routes = []
+
+    def route(self, pattern):
+        def decorator(func):
+            self.routes.append((pattern, func))
+            return func
+
+        return decorator
+
+    def url_for(self, func, *args, **kwargs):
+        for pattern, current in self.routes:
+            if current is func:
+                values = iter(args)
+                return self.base_url + re.sub('<[^>]+>', lambda match: '{}'.format(next(values)), pattern)
+
+        raise ValueError("No route for {}".format(func))
+
+    def run(self, argv=None):
+        path = re.sub('^plugin://[^/]+', '', (argv or sys.argv)[0]) or '/'
+        for pattern, func in self.routes:
+            match = re.match('^{}$'.format(re.sub('<[^>]+>', '([^/]+)', pattern)), path)
+            if match:
+                return func(*match.groups())
+
+        raise ValueError("No route matches {}".format(path))
+
+
+def install(profile):
+    """
+    Register fake modules in sys.modules, so following imports of plugin use them.
+
+    :param profile: string - directory used as add-on profile
+    """
+    state['profile'] = profile
+    if len(sys.argv) < 2 or not sys.argv[1].isdigit():
+        sys.argv = ['plugin://{}/'.format(ADDON_ID), '1', '']
+
+    modules = {
+        'xbmc': {
+            'LOGDEBUG': 0, 'LOGINFO': 1, 'LOGNOTICE': 2, 'LOGWARNING': 3, 'LOGERROR': 4, 'LOGSEVERE': 5,
+            'LOGFATAL': 6, 'LOGNONE': 7,
+            'translatePath': translate_path, 'log': log, 'executebuiltin': execute_builtin,
+            'executeJSONRPC': execute_json_rpc,
+        },
+        'xbmcaddon': {'Addon': Addon},
+        'xbmcgui': {'ListItem': ListItem, 'Dialog': Dialog, 'DialogProgressBG': DialogProgressBG,
+                    'INPUT_ALPHANUM': 0},
+        'xbmcplugin': {'setContent': set_content, 'addDirectoryItem': add_directory_item,
+                       'endOfDirectory': end_of_directory, 'setResolvedUrl': set_resolved_url},
+        'xbmcvfs': {'File': File, 'exists': vfs_exists, 'mkdirs': vfs_mkdirs, 'delete': vfs_delete,
+                    'rename': vfs_rename},
+        'routing': {'Plugin': Plugin},
+    }
+
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import re
+import socket
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+
+from resources.lib.fixtures import corpus
+
+""" Size of every fake stream file in bytes """
+STREAM_SIZE = 256 * 1024
+
+""" Session cookie value given to logged in user """
+SESSION_ID = 'fixture-session'
+
+
+class FixtureServer(ThreadingMixIn, HTTPServer):
+    """
+    Local stand-in for zalukaj.com serving pages rendered from fixture corpus.
+
+    Server listens on random local port, its address is available in `url` attribute.
+    Behaviour can be changed on the fly:
+        latency: float - seconds waited before every response
+        overloaded: bool - respond to every page request with 503 overload page
+        home_padding: int - number of dummy rows added to home page
+        stream_delays: dict - seconds waited before sending stream whose path contains key
+        stream_rate: int | None - maximum stream bytes send per second
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FixtureHandler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server_address[1])
+        self.latency = latency
+        self.overloaded = False
+        self.home_padding = 0
+        self.stream_delays = {}
+        self.stream_rate = None
+        self.requests = []
+        self._thread = None
+        self._connections = set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        for connection in list(self._connections):  # wake up handlers waiting on keep-alive connections
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        self.server_close()
+        self._thread.join()
+
+    def get_request(self):
+        connection, address = HTTPServer.get_request(self)
+        self._connections.add(connection)
+        return connection, address
+
+    def shutdown_request(self, request):
+        self._connections.discard(request)
+        HTTPServer.shutdown_request(self, request)
+
+    def handle_error(self, request, client_address):
+        pass  # connections dropped by clients or by stop are expected
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    pages = [
+        ('^/$', lambda server, match, query, logged: corpus.render_home(server.url, server.home_padding)),
+        ('^/serial/[a-z0-9-]+-([0-9]+)\.html$',
+         lambda server, match, query, logged: corpus.render_series(server.url, int(match.group(1)))),
+        ('^/kategoria-serialu/([0-9]+),1/[a-z0-9_]+_sezon_([0-9]+)/$',
+         lambda server, match, query, logged: corpus.render_season(
+             server.url, int(match.group(1)[:-len(match.group(2))]), int(match.group(2)))),
+        ('^/gatunek/([0-9]+)$',
+         lambda server, match, query, logged: corpus.render_genre(server.url, int(match.group(1)), 1)),
+        ('^/gatunek,([0-9]+)/[a-z-]+,wszystkie,strona-([0-9]+)$',
+         lambda server, match, query, logged: corpus.render_genre(
+             server.url, int(match.group(1)), int(match.group(2)))),
+        ('^/(zalukaj-film|serial-online)/([0-9]+)/[a-z0-9-]+\.html$',
+         lambda server, match, query, logged: corpus.render_movie(server.url, int(match.group(2)))),
+        ('^/player\.php$',
+         lambda server, match, query, logged: corpus.render_player(
+             server.url, int(query['w'][0]), int(query.get('v', [0])[0]))),
+        ('^/v2/ajax/load\.search$',
+         lambda server, match, query, logged: corpus.render_search(
+             server.url, query.get('q', [''])[0].decode('utf-8'))),
+        ('^/libs/ajax/login\.php$', lambda server, match, query, logged: corpus.render_user(logged)),
+    ]
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        time.sleep(self.server.latency)
+
+        if url.path.startswith('/stream/'):
+            return self._send_stream(url.path)
+
+        if self.server.overloaded:
+            return self._send(503, corpus.render_overload())
+
+        logged = 'PHPSESSID={}'.format(SESSION_ID) in (self.headers.get('Cookie') or '')
+        for pattern, render in self.pages:
+            match = re.match(pattern, url.path)
+            if match:
+                body = render(self.server, match, parse_qs(url.query), logged)
+                if body is not None:
+                    return self._send(200, body)
+
+        self._send(404, corpus.layout('404', '<h1>Nie znaleziono</h1>'))
+
+    def do_HEAD(self):
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        time.sleep(self.server.latency)
+        self._send_headers(200 if url.path.startswith('/stream/') else 405, 'video/mp4', STREAM_SIZE)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        time.sleep(self.server.latency)
+        form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+
+        if url.path != '/ajax/login':
+            return self._send(404, '')
+
+        if form.get('username') and form.get('password') and form.get('hash') == ['fixture']:
+            return self._send(200, 'Zalogowano!', {'Set-Cookie': 'PHPSESSID={}; Path=/'.format(SESSION_ID)})
+
+        self._send(200, 'Niepoprawne dane logowania.')
+
+    def _send(self, status, body, headers=None):
+        body = body.encode('utf-8')
+        self._send_headers(status, 'text/html; charset=utf-8', len(body), headers)
+        self.wfile.write(body)
+
+    def _send_headers(self, status, content_type, length, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _send_stream(self, path):
+        for key, delay in self.server.stream_delays.items():
+            if key in path:
+                time.sleep(delay)
+
+        start, end = 0, STREAM_SIZE - 1
+        status, headers = 200, {}
+        match = re.match('bytes=([0-9]+)-([0-9]*)', self.headers.get('Range') or '')
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else end, STREAM_SIZE - 1)
+            status, headers = 206, {'Content-Range': 'bytes {}-{}/{}'.format(start, end, STREAM_SIZE)}
+
+        self._send_headers(status, 'video/mp4', end - start + 1, headers)
+        chunk = 16 * 1024
+        for offset in range(start, end + 1, chunk):
+            if self.server.stream_rate:
+                time.sleep(float(chunk) / self.server.stream_rate)
+            self.wfile.write(b'\0' * min(chunk, end + 1 - offset))
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import unittest
+
+import mock
+from resources.lib import zalukaj
+from resources.lib.fixtures.server import FixtureServer
+
+
+class FixtureTestCase(unittest.TestCase):
+    """
+    Test case running against FixtureServer started once for the whole class.
+
+    Zalukaj URL points to the server and `data_path` is temporary directory shared by tests of the class.
+    Before every test server behaviour is reset and its request log cleared, `mkdtemp` gives directory removed
+    after the test.
+    """
+
+    """ Seconds waited by server before every response """
+    server_latency = 0.0
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FixtureServer(latency=cls.server_latency).start()
+        cls.url_patch = mock.patch.object(zalukaj, 'URL', cls.server.url)
+        cls.url_patch.start()
+        cls.data_path = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.url_patch.stop()
+        cls.server.stop()
+        shutil.rmtree(cls.data_path)
+
+    def setUp(self):
+        self.server.latency = self.server_latency
+        self.server.overloaded = False
+        self.server.home_padding = 0
+        self.server.stream_delays = {}
+        self.server.stream_rate = None
+        del self.server.requests[:]
+
+    def mkdtemp(self):
+        """
+        :return: string - temporary directory removed after the test
+        """
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        return path
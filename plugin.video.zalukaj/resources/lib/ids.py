@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import threading
+from base64 import b32encode, urlsafe_b64encode, urlsafe_b64decode
+from urlparse import urlparse
+
+from resources.lib.zalukaj import ZalukajError, canonical_url
+
+""" Number of characters in generated id """
+ID_LENGTH = 10
+
+""" Maximum number of urls in single lookup query """
+QUERY_CHUNK = 500
+
+
+class UnknownIdError(ZalukajError):
+    pass
+
+
+class IdMap(object):
+    """
+    Persistent two way map between canonical urls and short ids used in plugin routes.
+
+    Id is derived from hash of canonical url, so the same page gets the same id on every install, but it can be
+    resolved only with pairs kept in local storage. Links kept outside of plugin (library .strm files) use url_token,
+    which is resolved without the map. Known pairs are kept in memory dicts, so lookups in both directions are O(1)
+    after first use, and in storage, so ids stored by Kodi in its database stay valid between invocations.
+    """
+
+    def __init__(self, storage):
+        """
+        :param storage: Storage
+        """
+        self.storage = storage
+        self.storage.schema('CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY, url TEXT NOT NULL UNIQUE)')
+        self._ids = {}
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def id_for(self, link):
+        """
+        Return id of given link, registering it when seen for the first time.
+
+        :param link: string - any form of link accepted by canonical_url
+        :return: string - id
+        """
+        url = canonical_url(link)
+        with self._lock:
+            if url in self._ids:
+                return self._ids[url]
+
+        row = self.storage.fetch_one('SELECT id FROM ids WHERE url = ?', (url,))
+        if row:
+            item_id = row[0]
+        else:
+            with self.storage.transaction() as cursor:
+                item_id = self._register(cursor, url)
+
+        self._remember(item_id, url)
+        return item_id
+
+    def register(self, links):
+        """
+        Make ids of many links available at once, using single transaction for all new ones.
+        Call it before rendering listing, so following id_for calls are answered from memory.
+
+        :param links: list of strings - links in any form accepted by canonical_url
+        """
+        urls = set(canonical_url(link) for link in links)
+        with self._lock:
+            urls = [url for url in urls if url not in self._ids]
+
+        known = {}
+        for start in range(0, len(urls), QUERY_CHUNK):
+            chunk = urls[start:start + QUERY_CHUNK]
+            known.update((url, item_id) for item_id, url in self.storage.fetch_all(
+                'SELECT id, url FROM ids WHERE url IN ({})'.format(','.join('?' * len(chunk))), chunk))
+
+        with self.storage.transaction() as cursor:
+            for url in urls:
+                if url not in known:
+                    known[url] = self._register(cursor, url)
+
+        for url, item_id in known.items():
+            self._remember(item_id, url)
+
+    def url_for(self, item_id):
+        """
+        :param item_id: string - id returned by id_for
+        :return: string | None - canonical url or None when id is unknown
+        """
+        with self._lock:
+            if item_id in self._urls:
+                return self._urls[item_id]
+
+        row = self.storage.fetch_one('SELECT url FROM ids WHERE id = ?', (item_id,))
+        if row:
+            self._remember(item_id, row[0])
+            return row[0]
+
+        return None
+
+    def resolve(self, token):
+        """
+        Return url for token taken from route.
+        Tokens made by url_for and routes created by previous versions carry base64 encoded urls instead of ids,
+        they are resolved without the map.
+
+        :param token: string - id or base64 encoded link
+        :return: string - canonical url
+        :raise UnknownIdError: when token is not known id nor encoded link, ex. after database was removed
+        """
+        url = self.url_for(token)
+        if url is not None:
+            return url
+
+        try:
+            link = urlsafe_b64decode(str(token))
+        except (TypeError, ValueError):
+            link = None
+
+        if not link or not link.startswith(('/', 'http')):
+            raise UnknownIdError("Nieznany odnośnik, odśwież listę.")
+
+        return canonical_url(link)
+
+    @staticmethod
+    def _register(cursor, url):
+        """
+        Store new url under hash based id. On hash collision next candidate is derived from salted hash.
+
+        :param cursor: sqlite3.Cursor - cursor of open transaction
+        :return: string - id
+        """
+        salt = 0
+        while True:
+            candidate = make_id(url, salt)
+            row = cursor.execute('SELECT url FROM ids WHERE id = ?', (candidate,)).fetchone()
+            if row is None:
+                # Url could be registered by other process in the meantime
+                cursor.execute('INSERT OR IGNORE INTO ids (id, url) VALUES (?, ?)', (candidate, url))
+                return cursor.execute('SELECT id FROM ids WHERE url = ?', (url,)).fetchone()[0]
+
+            if row[0] == url:
+                return candidate
+
+            salt += 1
+
+    def _remember(self, item_id, url):
+        with self._lock:
+            self._ids[url] = item_id
+            self._urls[item_id] = url
+
+
+def url_token(link):
+    """
+    Token resolved by IdMap.resolve without local map, for links stored outside of plugin.
+
+    :param link: string - any form of link accepted by canonical_url
+    :return: string - urlsafe base64 encoded path of canonical url
+    """
+    parts = urlparse(canonical_url(link))
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    return urlsafe_b64encode(path.encode('utf-8') if isinstance(path, unicode) else path)
+
+
+def make_id(url, salt=0):
+    """
+    :return: string - lowercase base32 id made from url hash
+    """
+    data = url.encode('utf-8') if isinstance(url, unicode) else url
+    if salt:
+        data = '{}#{}'.format(data, salt)
+
+    return b32encode(hashlib.sha1(data).digest()).lower()[:ID_LENGTH]
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+import unittest
+from base64 import b64encode
+
+import mock
+from resources.lib import ids
+from resources.lib.ids import IdMap, ID_LENGTH, UnknownIdError, url_token
+from resources.lib.storage import Storage
+from resources.lib.zalukaj import canonical_url
+
+
+class TestCanonicalUrl(unittest.TestCase):
+
+    def test_links_to_the_same_page_are_equal(self):
+        expected = 'https://zalukaj.com/serial/simpsonowie-583.html'
+        for link in ['/serial/simpsonowie-583.html',
+                     'serial/simpsonowie-583.html',
+                     '//zalukaj.com/serial/simpsonowie-583.html',
+                     'http://zalukaj.com/serial/simpsonowie-583.html',
+                     'HTTPS://Zalukaj.com:443/serial/simpsonowie-583.html#sezony',
+                     expected]:
+            self.assertEqual(canonical_url(link), expected)
+
+    def test_external_links_keep_scheme(self):
+        self.assertEqual(canonical_url('http://cdn.example.com:80/a.jpg?x=1'), 'http://cdn.example.com/a.jpg?x=1')
+
+
+class TestIdMap(unittest.TestCase):
+
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.storage = Storage(self.data_path)
+        self.ids = IdMap(self.storage)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.data_path)
+
+    def test_round_trip(self):
+        link = '/kategoria-serialu/773656,1/simpsonowie_the_simpsons_sezon_30/'
+        item_id = self.ids.id_for(link)
+        self.assertEqual(len(item_id), ID_LENGTH)
+        self.assertEqual(self.ids.id_for('https://zalukaj.com' + link), item_id)
+        self.assertEqual(self.ids.resolve(item_id), 'https://zalukaj.com' + link)
+
+    def test_ids_are_persistent(self):
+        self.ids.register(['/gatunek/{}'.format(number) for number in range(50)])
+        item_id = self.ids.id_for('/gatunek/22')
+
+        other = IdMap(Storage(self.data_path))
+        self.assertEqual(other.url_for(item_id), 'https://zalukaj.com/gatunek/22')
+        self.assertEqual(other.id_for('/gatunek/22'), item_id)
+
+    def test_legacy_base64_routes(self):
+        self.assertEqual(self.ids.resolve(b64encode('/serial/futurama-12.html')),
+                         'https://zalukaj.com/serial/futurama-12.html')
+        self.assertIsNone(self.ids.url_for('unknown'))
+
+    def test_unknown_id(self):
+        item_id = IdMap(Storage(tempfile.mkdtemp(dir=self.data_path))).id_for('/gatunek/22')
+        self.assertRaises(UnknownIdError, self.ids.resolve, item_id)
+        self.assertRaises(UnknownIdError, self.ids.resolve, u'za\u017c\u00f3\u0142\u0107')
+
+    def test_url_token_is_resolved_without_map(self):
+        token = url_token('https://zalukaj.com/zalukaj-film/12/pi\xc4\x99kna.html?x=1')
+        self.assertNotIn('/', token)
+        self.assertIsNone(self.ids.url_for(token))
+        self.assertEqual(self.ids.resolve(token), 'https://zalukaj.com/zalukaj-film/12/pi\xc4\x99kna.html?x=1')
+
+    def test_hash_collision(self):
+        with mock.patch.object(ids, 'make_id', side_effect=lambda url, salt=0: 'same' if not salt else str(salt)):
+            first = self.ids.id_for('/gatunek/1')
+            second = self.ids.id_for('/gatunek/2')
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.ids.url_for(first), 'https://zalukaj.com/gatunek/1')
+        self.assertEqual(self.ids.url_for(second), 'https://zalukaj.com/gatunek/2')
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import threading
+from collections import deque
+from urlparse import urlparse
+
+""" Timeout of requests to endpoint without enough measured samples """
+DEFAULT_TIMEOUT = 5
+
+""" Number of last samples kept per endpoint """
+WINDOW = 50
+
+""" Number of samples needed to compute hedge delay from percentiles """
+MIN_SAMPLES = 5
+
+""" Number of samples needed to compute timeout, p95 of them ignores a single outlier """
+MIN_TIMEOUT_SAMPLES = 20
+
+""" Percentile of endpoint latency on which timeout is based """
+TIMEOUT_PERCENTILE = 95
+
+""" Timeout is this many times longer than p95 of endpoint latency """
+TIMEOUT_FACTOR = 3
+
+""" Bounds of computed timeout in seconds, never longer than timeout used without samples """
+MIN_TIMEOUT = 1
+MAX_TIMEOUT = DEFAULT_TIMEOUT
+
+
+def endpoint(url):
+    """
+    Group urls of the same kind of page, like all tv series pages or all genre pages.
+
+    :param url: string - absolute url
+    :return: string - host with first path segment
+    """
+    parts = urlparse(url)
+    return "{}/{}".format(parts.netloc, parts.path.strip('/').split('/')[0])
+
+
+def percentile(samples, rank):
+    """
+    Nearest-rank percentile of sorted samples.
+    """
+    return samples[max(0, int(math.ceil(rank / 100.0 * len(samples))) - 1)]
+
+
+class LatencyTracker(object):
+    """
+    Latency of service endpoints, measured for every request and kept between plugin invocations.
+
+    Request timeout follows p95 of endpoint latency, which is also the delay after which idempotent request is hedged.
+    Until endpoint has enough samples, DEFAULT_TIMEOUT is used and requests are not hedged. Requests which timed out
+    are not samples, so one stuck request does not make following timeouts longer.
+    """
+
+    def __init__(self, storage=None, window=WINDOW):
+        """
+        :param storage: Storage | None - samples are kept only in memory without storage
+        :param window: int - number of last samples kept per endpoint
+        """
+        self.storage = storage
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+        if self.storage:
+            self.storage.schema('CREATE TABLE IF NOT EXISTS latencies ('
+                                'endpoint TEXT PRIMARY KEY, samples TEXT NOT NULL)')
+
+    def record(self, name, seconds):
+        """
+        :param name: string - endpoint name
+        :param seconds: float - time from sending request to receiving response
+        """
+        with self._lock:
+            samples = self._load(name)
+            samples.append(round(seconds, 4))
+            data = json.dumps(list(samples))
+
+        if self.storage:
+            self.storage.execute('INSERT OR REPLACE INTO latencies (endpoint, samples) VALUES (?, ?)', (name, data))
+
+    def percentile(self, name, rank, min_samples=MIN_SAMPLES):
+        """
+        :param min_samples: int - number of samples needed to compute percentile
+        :return: float | None - latency percentile of endpoint, None when there is not enough samples
+        """
+        with self._lock:
+            samples = sorted(self._load(name))
+
+        return percentile(samples, rank) if len(samples) >= min_samples else None
+
+    def timeout(self, name):
+        """
+        :return: float - seconds to wait for response from endpoint
+        """
+        latency = self.percentile(name, TIMEOUT_PERCENTILE, MIN_TIMEOUT_SAMPLES)
+        if latency is None:
+            return DEFAULT_TIMEOUT
+
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, latency * TIMEOUT_FACTOR))
+
+    def hedge_delay(self, name):
+        """
+        :return: float | None - seconds after which duplicate request is sent, None when it should not be hedged
+        """
+        return self.percentile(name, 95)
+
+    def _load(self, name):
+        if name not in self._samples:
+            row = self.storage.fetch_one('SELECT samples FROM latencies WHERE endpoint = ?',
+                                         (name,)) if self.storage else None
+            self._samples[name] = deque(json.loads(row[0]) if row else [], maxlen=self.window)
+
+        return self._samples[name]
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import requests
+from resources.lib import latency, zalukaj
+from resources.lib.fixtures import FixtureTestCase, corpus
+from resources.lib.latency import LatencyTracker, endpoint
+from resources.lib.storage import Storage
+from resources.lib.workers import RateLimiter
+from resources.lib.zalukaj import Zalukaj, ZalukajConnectionError
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.storage = Storage(self.data_path)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.data_path)
+
+    def test_endpoint(self):
+        self.assertEqual(endpoint('https://zalukaj.com/serial/futurama-501.html'), 'zalukaj.com/serial')
+        self.assertEqual(endpoint('https://zalukaj.com/'), 'zalukaj.com/')
+
+    def test_timeout_follows_percentiles(self):
+        tracker = LatencyTracker(self.storage)
+        self.assertEqual(tracker.timeout('a'), latency.DEFAULT_TIMEOUT)
+        self.assertIsNone(tracker.hedge_delay('a'))
+
+        for seconds in [0.1] * 5:
+            tracker.record('a', seconds)
+        self.assertEqual(tracker.hedge_delay('a'), 0.1)
+        self.assertEqual(tracker.timeout('a'), latency.DEFAULT_TIMEOUT)
+
+        for seconds in [0.1] * 12 + [0.4, 0.6, 4]:
+            tracker.record('a', seconds)
+
+        self.assertEqual(tracker.hedge_delay('a'), 0.6)
+        self.assertAlmostEqual(tracker.timeout('a'), 1.8)
+
+        for _ in range(latency.WINDOW):
+            tracker.record('a', 0.01)
+        self.assertEqual(tracker.timeout('a'), latency.MIN_TIMEOUT)
+
+    def test_single_slow_response_is_ignored(self):
+        tracker = LatencyTracker(self.storage)
+        for seconds in [0.2] * 49 + [5]:
+            tracker.record('a', seconds)
+        self.assertEqual(tracker.timeout('a'), latency.MIN_TIMEOUT)
+
+        for _ in range(latency.WINDOW):
+            tracker.record('a', 10)
+        self.assertEqual(tracker.timeout('a'), latency.MAX_TIMEOUT)
+
+    def test_timeouts_are_not_recorded(self):
+        client = Zalukaj(self.data_path, latency=LatencyTracker(self.storage))
+        client.session.request = mock.Mock(side_effect=requests.Timeout())
+
+        self.assertRaises(ZalukajConnectionError, client._send, 'get', url='https://zalukaj.com/serial/a.html')
+        self.assertIsNone(client.latency.percentile('zalukaj.com/serial', 0, min_samples=1))
+
+    def test_samples_are_persisted(self):
+        tracker = LatencyTracker(self.storage, window=5)
+        for seconds in range(1, 8):
+            tracker.record('a', seconds)
+
+        self.assertEqual(LatencyTracker(self.storage).percentile('a', 0), 3)
+
+
+class TestHedgedRequests(FixtureTestCase):
+
+    def setUp(self):
+        super(TestHedgedRequests, self).setUp()
+        self.data_path = self.mkdtemp()
+        self.link = corpus.series_url(*corpus.series()[0][0:2])
+
+    def client(self, concurrency):
+        client = Zalukaj(self.data_path, limiter=RateLimiter(concurrency=concurrency))
+        for _ in range(latency.MIN_SAMPLES):
+            client.latency.record(endpoint(zalukaj.canonical_url(self.link)), 0.05)
+
+        # The first request is stuck, like on overloaded server node
+        request = client.session.request
+        calls = []
+
+        def slow_first(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                time.sleep(1)
+            return request(*args, **kwargs)
+
+        client.session.request = slow_first
+        return client
+
+    def test_slow_request_is_hedged(self):
+        client = self.client(concurrency=2)
+        start = time.time()
+        seasons = client.fetch_tv_series_seasons_list(self.link)
+
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(seasons), corpus.SEASONS)
+        self.assertEqual(client.stats['hedged'], 1)
+
+    def test_hedging_respects_limiter(self):
+        client = self.client(concurrency=1)
+        start = time.time()
+        client.fetch_tv_series_seasons_list(self.link)
+
+        self.assertGreaterEqual(time.time() - start, 1)
+        self.assertEqual(client.stats['hedged'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from resources.lib.ids import QUERY_CHUNK
+from resources.lib.zalukaj import ZalukajError, canonical_url
+
+""" Movies which appeared in catalog most recently first """
+ORDER_ADDED = 'added'
+
+""" The newest movies by production year first """
+ORDER_YEAR = 'year'
+
+""" Maximum number of movies in aggregated list """
+LATEST_LIMIT = 200
+
+logger = logging.getLogger(__name__)
+
+
+class LatestAdditions(object):
+    """
+    Latest additions of all genres merged into single list.
+
+    First pages of all genres are fetched concurrently (limited by rate limiter of the client), genres with fresh
+    page in cache are not fetched at all. Movies are deduplicated by canonical url, time when movie was seen for the
+    first time is kept in storage, so movies added to service since previous visits are listed first.
+    """
+
+    def __init__(self, cache, client, ids, cached=True):
+        """
+        :param cache: CachedZalukaj - first pages of genres are stored as movies listings
+        :param client: AsyncZalukaj - client wrapped by cache
+        :param ids: IdMap
+        :param cached: bool - False when stored lists are disabled, genres and their pages are then always fetched
+            and only first seen times are stored
+        """
+        self.cache = cache
+        self.client = client
+        self.ids = ids
+        self.cached = cached
+        self.cache.storage.schema('CREATE TABLE IF NOT EXISTS first_seen (id TEXT PRIMARY KEY, seen_at REAL NOT NULL)')
+
+    def fetch(self, order=ORDER_ADDED, limit=LATEST_LIMIT):
+        """
+        :param order: string - ORDER_ADDED or ORDER_YEAR
+        :param limit: int - maximum number of returned movies
+        :return: list of dicts, like movies returned by Zalukaj.fetch_movies_list, with:
+            first_seen: float - time when movie was seen for the first time
+        """
+        genres = (self.cache if self.cached else self.cache.client).fetch_movie_categories_list()
+
+        # Position on genre page keeps order of service for movies seen at the same time
+        movies = {}
+        for page in self.first_pages([genre['url'] for genre in genres]):
+            for position, item in enumerate(item for item in page if 'nav' not in item):
+                url = canonical_url(item['url'])
+                if url not in movies or position < movies[url][0]:
+                    movies[url] = (position, item)
+
+        seen = self._first_seen(list(movies.keys()))
+        latest = [dict(item, first_seen=seen[url], position=position) for url, (position, item) in movies.items()]
+
+        if order == ORDER_YEAR:
+            latest.sort(key=lambda movie: (-(movie.get('year') or 0), -movie['first_seen'], movie['position']))
+        else:
+            latest.sort(key=lambda movie: (-movie['first_seen'], movie['position'], -(movie.get('year') or 0)))
+
+        for movie in latest:
+            del movie['position']
+
+        return latest[0:limit]
+
+    def first_pages(self, links):
+        """
+        Return first pages of genres, fetching concurrently only genres without fresh page in cache.
+        When fetch fails, stale page from cache is used.
+
+        :param links: list of strings - genre links
+        :return: list of lists of movies, in order of links
+        """
+        pages = {}
+        pending = {}
+        for link in links:
+            cached = self.cache.get('movies', link) if self.cached else None
+            if cached is not None and time.time() - cached.fetched_at <= self.cache.freshness['movies']:
+                pages[link] = cached
+            else:
+                pending[link] = (self.client.fetch_movies_list(link), cached)
+
+        error = None
+        for link, (future, cached) in pending.items():
+            try:
+                pages[link] = self.cache.put('movies', link, future.result()) if self.cached else future.result()
+            except ZalukajError as e:
+                logger.warning("Genre %s was not refreshed: %s", link, e)
+                error = e
+                if cached is not None:
+                    pages[link] = cached
+
+        if error is not None and not pages:
+            raise error
+
+        return [pages[link] for link in links if link in pages]
+
+    def _first_seen(self, urls):
+        """
+        :return: dict url: time when movie was seen for the first time, movies not seen before are stored now
+        """
+        self.ids.register(urls)
+        item_ids = dict((self.ids.id_for(url), url) for url in urls)
+        keys = list(item_ids.keys())
+        now = time.time()
+
+        with self.cache.storage.transaction() as cursor:
+            cursor.executemany('INSERT OR IGNORE INTO first_seen (id, seen_at) VALUES (?, ?)',
+                               [(item_id, now) for item_id in keys])
+
+        seen = {}
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            for item_id, seen_at in self.cache.storage.fetch_all(
+                    'SELECT id, seen_at FROM first_seen WHERE id IN ({})'.format(','.join('?' * len(chunk))), chunk):
+                seen[item_ids[item_id]] = seen_at
+
+        return seen
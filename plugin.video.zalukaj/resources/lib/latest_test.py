@@ -0,0 +1,83 @@
+import time
+import unittest
+
+from resources.lib.cache import CachedZalukaj
+from resources.lib.fixtures import FixtureTestCase, corpus
+from resources.lib.ids import IdMap
+from resources.lib.latest import LatestAdditions, ORDER_YEAR
+from resources.lib.storage import Storage
+from resources.lib.zalukaj import Zalukaj, canonical_url
+from resources.lib.zalukaj_async import AsyncZalukaj
+
+
+class TestLatestAdditions(FixtureTestCase):
+
+    server_latency = 0.1
+
+    def setUp(self):
+        super(TestLatestAdditions, self).setUp()
+        self.data_path = self.mkdtemp()
+        self.storage = Storage(self.data_path)
+        self.ids = IdMap(self.storage)
+        client = Zalukaj(self.data_path)
+        self.async_client = AsyncZalukaj(client)
+        self.cache = CachedZalukaj(client, self.storage, self.ids)
+        self.latest = LatestAdditions(self.cache, self.async_client, self.ids)
+        self.genres = [genre['url'] for genre in self.cache.fetch_movie_categories_list()]
+
+    def tearDown(self):
+        self.async_client.close()
+        self.storage.close()
+
+    def genre_requests(self):
+        return [path for path in self.server.requests if path.startswith('/gatunek')]
+
+    def test_genres_are_fetched_concurrently_and_merged(self):
+        start = time.time()
+        movies = self.latest.fetch()
+        elapsed = time.time() - start
+
+        expected = set(canonical_url(item['url'])
+                       for genre in self.genres for item in self.cache.get('movies', genre) if 'nav' not in item)
+        self.assertEqual(sorted(canonical_url(movie['url']) for movie in movies), sorted(expected))
+        self.assertEqual(len(self.genre_requests()), len(corpus.GENRES))
+        self.assertLess(elapsed, 0.1 * (len(corpus.GENRES) + 1))
+
+    def test_only_expired_genres_are_refreshed(self):
+        self.latest.fetch()
+        del self.server.requests[:]
+
+        self.latest.fetch()
+        self.assertEqual(self.server.requests, [])
+
+        cached = self.cache.get('movies', self.genres[2])
+        self.cache.put('movies', self.genres[2], cached, fetched_at=time.time() - 2 * 3600)
+        self.latest.fetch()
+        self.assertEqual(len(self.genre_requests()), 1)
+        self.assertIn(self.genre_requests()[0], self.genres[2])
+
+    def test_without_cache_all_genres_are_fetched(self):
+        latest = LatestAdditions(self.cache, self.async_client, self.ids, cached=False)
+        movies = latest.fetch()
+        del self.server.requests[:]
+
+        self.assertEqual(latest.fetch(), movies)
+        self.assertEqual(len(self.genre_requests()), len(corpus.GENRES))
+        self.assertIn('/', self.server.requests)
+        self.assertIsNone(self.cache.get('movies', self.genres[0]))
+
+    def test_newly_seen_movies_are_first(self):
+        movies = self.latest.fetch()
+        newest = movies[-1]
+        self.storage.execute('UPDATE first_seen SET seen_at = seen_at - 3600 WHERE id != ?',
+                             (self.ids.id_for(newest['url']),))
+
+        self.assertEqual(self.latest.fetch()[0]['url'], newest['url'])
+
+    def test_order_by_year(self):
+        years = [movie['year'] for movie in self.latest.fetch(ORDER_YEAR)]
+        self.assertEqual(years, sorted(years, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
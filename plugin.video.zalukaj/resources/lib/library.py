@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import re
+import threading
+from xml.sax.saxutils import escape
+
+import xbmcvfs
+
+""" Directories inside library folder, add them to Kodi library as tv shows and movies sources """
+TV_SHOWS_DIR = "Seriale"
+MOVIES_DIR = "Filmy"
+
+""" File in library folder keeping progress of unfinished exports """
+FILE_STATE_NAME = "zalukaj-export.json"
+
+logger = logging.getLogger(__name__)
+
+
+def to_unicode(text):
+    return text.decode('utf-8') if isinstance(text, str) else text
+
+
+def join(path, *parts):
+    """
+    Join path of library folder with its subpaths. Network folders (smb://, nfs://) are joined with slashes,
+    which os.path.join does not use on Windows.
+    """
+    if '://' in path:
+        return u'/'.join([path.rstrip(u'/')] + [part.strip(u'/') for part in parts])
+
+    return os.path.join(path, *parts)
+
+
+def dirname(path):
+    return path.rsplit(u'/', 1)[0] if '://' in path else os.path.dirname(path)
+
+
+def vfs_path(path):
+    """
+    :return: string - utf-8 encoded path passed to xbmcvfs, independent of locale of file system
+    """
+    return path.encode('utf-8') if isinstance(path, unicode) else path
+
+
+def exists(path):
+    return bool(xbmcvfs.exists(vfs_path(path)))
+
+
+def make_dirs(directory):
+    """
+    :raise IOError: when directory could not be created
+    """
+    if not xbmcvfs.exists(vfs_path(join(directory, u''))) and not xbmcvfs.mkdirs(vfs_path(directory)):
+        raise IOError("Nie można utworzyć folderu {}".format(vfs_path(directory)))
+
+
+def read_file(path):
+    """
+    :return: unicode - content of utf-8 encoded file
+    """
+    handle = xbmcvfs.File(vfs_path(path))
+    try:
+        return to_unicode(handle.read())
+    finally:
+        handle.close()
+
+
+def write_file(path, content):
+    """
+    :raise IOError: when file could not be written
+    """
+    handle = xbmcvfs.File(vfs_path(path), 'w')
+    try:
+        written = handle.write(to_unicode(content).encode('utf-8'))
+    finally:
+        handle.close()
+
+    if not written:
+        raise IOError("Nie można zapisać pliku {}".format(vfs_path(path)))
+
+
+def safe_name(text):
+    """
+    Make file name from title, removing characters not allowed by common file systems.
+    """
+    return re.sub(r'[\\/:*?"<>|]+', ' ', to_unicode(text)).strip(' .') or u'_'
+
+
+def nfo(root, fields):
+    """
+    Render Kodi nfo document.
+
+    :param root: string - root element name, ex. movie, tvshow, episodedetails
+    :param fields: list of tuples (name, value) - empty values are skipped
+    :return: unicode - xml document
+    """
+    lines = [u'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>', u'<{}>'.format(root)]
+    for name, value in fields:
+        if value is not None and value != '':
+            value = u'{}'.format(value) if isinstance(value, int) else to_unicode(value)
+            lines.append(u'    <{0}>{1}</{0}>'.format(name, escape(value)))
+    lines.append(u'</{}>'.format(root))
+    return u'\n'.join(lines) + u'\n'
+
+
+class ExportState(object):
+    """
+    Links already exported by unfinished export jobs.
+    State is saved after every link, so interrupted export skips finished parts when started again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        if exists(path):
+            try:
+                self._jobs = json.loads(read_file(path))
+            except ValueError as e:  # damaged file, e.g. written when Kodi was killed, export starts from scratch
+                logger.warning("Export state %s was not loaded: %s", path, e)
+
+    def is_done(self, job, link):
+        with self._lock:
+            return link in self._jobs.get(job, [])
+
+    def mark_done(self, job, link):
+        with self._lock:
+            self._jobs.setdefault(job, []).append(link)
+            self._save()
+
+    def finish(self, job):
+        with self._lock:
+            if self._jobs.pop(job, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        if self._jobs:  # without unfinished jobs there is nothing to resume, so state file is only removed
+            write_file(tmp_path, json.dumps(self._jobs))
+
+        if exists(self.path):
+            xbmcvfs.delete(vfs_path(self.path))
+
+        if self._jobs and not xbmcvfs.rename(vfs_path(tmp_path), vfs_path(self.path)):
+            raise IOError("Nie można zapisać pliku {}".format(vfs_path(self.path)))
+
+
+class LibraryExporter(object):
+    """
+    Export tv series and movie genres into folder with .strm and .nfo files, ready to be scanned by Kodi library.
+
+    Every .strm file contains plugin:// address of play route, so stream is resolved only when item is played.
+    Export is incremental, files already present in library are not written again. Files are written through
+    xbmcvfs, so library folder can be also a network share.
+    """
+
+    def __init__(self, client, library_path, play_url):
+        """
+        :param client: AsyncZalukaj - client used to fetch listings concurrently
+        :param library_path: string - root folder of exported library, local or network (smb://, nfs://)
+        :param play_url: function - returns plugin:// address playing given link
+        """
+        self.client = client
+        self.library_path = library_path
+        self.play_url = play_url
+        self.state = ExportState(join(library_path, FILE_STATE_NAME))
+        self._lock = threading.Lock()
+
+    def export_tv_series(self, link, title):
+        """
+        Export all seasons and episodes of tv series.
+
+        :param link: string - tv series url
+        :param title: string - tv series name
+        :return: dict with number of written and skipped episodes
+        """
+        stats = {'written': 0, 'skipped': 0}
+        job = 'tv:{}'.format(link)
+        show_path = join(self.library_path, TV_SHOWS_DIR, safe_name(title))
+
+        seasons = self.client.fetch_tv_series_seasons_list(link).result()
+        thumb = seasons[0]['img'] if seasons else None
+        self._write(join(show_path, u'tvshow.nfo'), nfo('tvshow', [('title', title), ('thumb', thumb)]))
+
+        pending = [season['url'] for season in seasons if not self.state.is_done(job, season['url'])]
+        futures = [(season_link, self.client.fetch_tv_series_episodes_list(season_link)) for season_link in pending]
+        for season_link, future in futures:
+            for episode in future.result():
+                if episode['season'] is None or episode['episode'] is None:
+                    continue
+
+                self._export_item(
+                    join(show_path, u'Season {:02d}'.format(episode['season'])),
+                    u'{} S{:02d}E{:02d}'.format(safe_name(title), episode['season'], episode['episode']),
+                    episode['url'],
+                    nfo('episodedetails', [
+                        ('title', episode['title']),
+                        ('showtitle', title),
+                        ('season', episode['season']),
+                        ('episode', episode['episode']),
+                        ('thumb', episode['img']),
+                    ]),
+                    stats)
+
+            self.state.mark_done(job, season_link)
+
+        self.state.finish(job)
+        return stats
+
+    def export_movies(self, link):
+        """
+        Export all movies of genre, following its pages.
+
+        :param link: string - genre url
+        :return: dict with number of written and skipped movies
+        """
+        stats = {'written': 0, 'skipped': 0}
+        job = 'movies:{}'.format(link)
+        last_page = 0
+        page = self.client.fetch_movies_list(link)
+
+        while page:
+            movies = page.result()
+            pages = [item for item in movies if item.get('nav') and item['page'] > last_page]
+            next_page = max(pages, key=lambda item: item['page']) if pages else None
+            # next page is downloaded while files of this one are written
+            page = self.client.fetch_movies_list(next_page['url']) if next_page else None
+
+            if not self.state.is_done(job, link):
+                self._write_movies([movie for movie in movies if not movie.get('nav')], stats)
+                self.state.mark_done(job, link)
+
+            if next_page:
+                link, last_page = next_page['url'], next_page['page']
+
+        self.state.finish(job)
+        return stats
+
+    def _write_movies(self, movies, stats):
+        for movie in movies:
+            name = safe_name(u'{} ({})'.format(to_unicode(movie['title']), movie['year'])
+                             if movie.get('year') else movie['title'])
+            self._export_item(join(self.library_path, MOVIES_DIR, name), name, movie['url'], nfo('movie', [
+                ('title', movie['title']),
+                ('year', movie.get('year')),
+                ('plot', movie.get('description')),
+                ('thumb', movie.get('img')),
+            ]), stats)
+
+    def _export_item(self, directory, name, link, nfo_document, stats):
+        """
+        Write .nfo and .strm files of single item if it is not exported yet.
+        Stream file is written last, so item interrupted in the middle is exported again.
+
+        :param stats: dict - counters updated with result
+        """
+        strm_path = join(directory, name + u'.strm')
+        with self._lock:
+            if exists(strm_path):
+                stats['skipped'] += 1
+                return
+
+            stats['written'] += 1
+
+        self._write(join(directory, name + u'.nfo'), nfo_document)
+        self._write(strm_path, self.play_url(link))
+
+    def _write(self, path, content):
+        with self._lock:
+            make_dirs(dirname(path))
+
+        write_file(path, content)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import mock
+from resources.lib.fixtures import FixtureTestCase, corpus, kodi
+from resources.lib.zalukaj import Zalukaj
+from resources.lib.zalukaj_async import AsyncZalukaj
+
+
+class TestLibraryExporter(FixtureTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestLibraryExporter, cls).setUpClass()
+        cls.client = AsyncZalukaj(Zalukaj(cls.data_path))
+        kodi.install(cls.data_path)
+        from resources.lib import library
+        cls.library = library
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        super(TestLibraryExporter, cls).tearDownClass()
+
+    def setUp(self):
+        super(TestLibraryExporter, self).setUp()
+        self.library_path = self.mkdtemp()
+        self.exporter = self.library.LibraryExporter(self.client, self.library_path,
+                                                     lambda link: 'plugin://test/play/' + link)
+
+    def path(self, *parts):
+        """
+        :return: string - utf-8 encoded path inside library, usable without utf-8 locale
+        """
+        return os.path.join(self.library_path, *parts).encode('utf-8')
+
+    def test_export_tv_series(self):
+        stats = self.exporter.export_tv_series('/serial/slepnac-od-swiatel-503.html', u'Ślepnąc od świateł')
+        self.assertEqual(stats, {'written': corpus.SEASONS * corpus.EPISODES, 'skipped': 0})
+
+        show = (self.library.TV_SHOWS_DIR, u'Ślepnąc od świateł')
+        self.assertTrue(os.path.isfile(self.path(*show + (u'tvshow.nfo',))))
+        episode = show + (u'Season 02', u'Ślepnąc od świateł S02E03')
+        with io.open(self.path(*episode) + '.strm', encoding='utf-8') as handle:
+            self.assertRegexpMatches(handle.read(), '^plugin://test/play/http://127.0.0.1:[0-9]+/serial-online/')
+        with io.open(self.path(*episode) + '.nfo', encoding='utf-8') as handle:
+            self.assertIn(u'<episode>3</episode>', handle.read())
+
+        self.assertFalse(os.path.isfile(self.path(self.library.FILE_STATE_NAME)))
+
+    def test_export_is_incremental(self):
+        self.exporter.export_tv_series('/serial/futurama-501.html', u'Futurama')
+        stats = self.exporter.export_tv_series('/serial/futurama-501.html', u'Futurama')
+        self.assertEqual(stats, {'written': 0, 'skipped': corpus.SEASONS * corpus.EPISODES})
+
+    def test_export_is_resumed(self):
+        link = '/serial/futurama-501.html'
+        first_season = corpus.season_url(501, 'futurama', 1)
+        state = self.library.ExportState(os.path.join(self.library_path, self.library.FILE_STATE_NAME))
+        state.mark_done('tv:{}'.format(link), first_season)
+
+        exporter = self.library.LibraryExporter(self.client, self.library_path, lambda url: url)
+        del self.server.requests[:]
+        stats = exporter.export_tv_series(link, u'Futurama')
+
+        self.assertEqual(stats['written'], corpus.EPISODES)
+        self.assertNotIn(first_season, self.server.requests)
+
+    def test_damaged_state_is_ignored(self):
+        with open(os.path.join(self.library_path, self.library.FILE_STATE_NAME), 'w') as handle:
+            handle.write('{"tv:/serial')
+
+        exporter = self.library.LibraryExporter(self.client, self.library_path, lambda url: url)
+        stats = exporter.export_tv_series('/serial/futurama-501.html', u'Futurama')
+        self.assertEqual(stats['written'], corpus.SEASONS * corpus.EPISODES)
+
+    def test_next_movies_page_is_prefetched(self):
+        calls = []
+        fetch_movies_list = self.client.fetch_movies_list
+
+        def fetch(link):
+            calls.append('fetch')
+            return fetch_movies_list(link)
+
+        with mock.patch.object(self.client, 'fetch_movies_list', side_effect=fetch), \
+                mock.patch.object(self.exporter, '_write_movies', side_effect=lambda *args: calls.append('write')):
+            self.exporter.export_movies('/gatunek/25')
+
+        self.assertEqual(calls[:3], ['fetch', 'fetch', 'write'])
+        self.assertEqual(calls.count('write'), calls.count('fetch'))
+
+    def test_export_movies(self):
+        stats = self.exporter.export_movies('/gatunek/25')
+        movies = [movie for movie in corpus.MOVIES if 25 in movie[4]]
+        self.assertGreater(len(movies), corpus.MOVIES_PER_PAGE)
+        self.assertEqual(stats, {'written': len(movies), 'skipped': 0})
+
+        with io.open(self.path(self.library.MOVIES_DIR, u'Dzień świra (2002)', u'Dzień świra (2002).nfo'),
+                     encoding='utf-8') as handle:
+            document = handle.read()
+        self.assertIn(u'<year>2002</year>', document)
+        self.assertIn(u'<plot>Jeden dzień z życia.</plot>', document)
@@ -2,7 +2,6 @@
 import json
 import logging
 import sys
-from base64 import b64encode, b64decode
 
 import routing
 import xbmc
@@ -10,13 +9,27 @@ import xbmcaddon
 import xbmcgui
 import xbmcplugin
 from resources.lib import kodilogging
-from resources.lib.kodiutils import notification, get_setting_as_bool, get_setting
-from resources.lib.zalukaj import Zalukaj, ZalukajError
+from resources.lib.cache import CachedZalukaj, DEFAULT_FRESHNESS, REFRESH_EXIT_TIMEOUT
+from resources.lib.ids import IdMap, url_token
+from resources.lib.kodiutils import notification, get_setting_as_bool, get_setting, get_setting_as_int
+from resources.lib.latest import LatestAdditions, ORDER_ADDED, ORDER_YEAR
+from resources.lib.latency import LatencyTracker
+from resources.lib.library import LibraryExporter, join
+from resources.lib.probe import StreamProber, VIDEO_QUALITIES, quality_height, quality_preference
+from resources.lib.series_index import SeriesIndex, DIGITS, OTHER
+from resources.lib.session_store import SessionStore
+from resources.lib.snapshot import CatalogSnapshot, SnapshotError, snapshot_name
+from resources.lib.storage import Storage
+from resources.lib.zalukaj import Zalukaj, ZalukajError, canonical_url
+from resources.lib.zalukaj_async import AsyncZalukaj
 from xbmcgui import ListItem
 from xbmcplugin import setResolvedUrl, addDirectoryItem, endOfDirectory
 
 ADDON = xbmcaddon.Addon()
 
+""" Values of video.version setting, in the same order """
+VIDEO_VERSIONS = ['Lektor', 'Napisy PL', 'Angielska']
+
 # Get the plugin url in plugin:// notation.
 _url = sys.argv[0]
 
@@ -30,7 +43,19 @@ logger = logging.getLogger(ADDON.getAddonInfo('id'))
 kodilogging.config()
 plugin = routing.Plugin()
 
-zalukaj = Zalukaj(DATAPATH)
+storage = Storage(DATAPATH)
+ids = IdMap(storage)
+
+zalukaj = Zalukaj(DATAPATH, latency=LatencyTracker(storage), store=SessionStore(storage))
+zalukaj_async = AsyncZalukaj(zalukaj)
+prober = StreamProber(storage, session=zalukaj.session, pool=zalukaj_async.pool)
+
+# Listings are served from cache when enabled, freshness settings are in hours and maximum staleness in days
+cache = CachedZalukaj(zalukaj, storage, ids,
+                      freshness={kind: get_setting_as_int('cache.{}'.format(kind)) * 3600
+                                 for kind in DEFAULT_FRESHNESS},
+                      max_staleness=get_setting_as_int('cache.max_stale') * 24 * 3600)
+catalog = cache if get_setting_as_bool('cache.enabled') else zalukaj
 
 data_is_login = get_setting_as_bool('zalukaj_login')
 data_username = get_setting('zalukaj_username')
@@ -38,6 +63,9 @@ data_password = get_setting('zalukaj_password')
 
 data_video_quality = get_setting('video.quality')
 data_video_version = get_setting('video.version')
+data_video_probe = get_setting_as_bool('video.probe')
+
+data_library_path = xbmc.translatePath(get_setting('library.path')).decode('utf-8')
 
 
 def logout():
@@ -50,7 +78,7 @@ def login():
     """
 
     current_user = zalukaj.fetch_user_data()
-    if zalukaj.fetch_user_data().is_logged():
+    if current_user.is_logged():
         return current_user
 
     current_user = zalukaj.login(user=data_username, password=data_password)
@@ -82,8 +110,12 @@ def index():
                                  ListItem("%s - %s" % (user.name.lower(), user.account_type)), True)
                 addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_list),
                                  ListItem("[COLOR=lime]Seriale[/COLOR]"), True)
+                addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_letters),
+                                 ListItem("[COLOR=lime]Seriale A-Z[/COLOR]"), True)
                 addDirectoryItem(plugin.handle, plugin.url_for(show_movies_section_list, "kind"),
                                  ListItem("[COLOR=lime]Filmy - gatunki[/COLOR]"), True)
+                addDirectoryItem(plugin.handle, plugin.url_for(show_movies_section_list, "latest"),
+                                 ListItem("[COLOR=lime]Filmy - ostatnio dodane[/COLOR]"), True)
                 addDirectoryItem(plugin.handle, plugin.url_for(show_search),
                                  ListItem("[COLOR=gold]Szukaj[/COLOR]"), True)
         except ZalukajError as e:
@@ -97,8 +129,6 @@ def index():
     # addDirectoryItem(plugin.handle, plugin.url_for(show_movies_section_list, "popularity"),
     #                  ListItem("Filmy - najpopularniejsze"), True)
     # addDirectoryItem(plugin.handle, plugin.url_for(show_movies_section_list, "popularity"),
-    #                  ListItem("Filmy - ostatnio dodane"), True)
-    # addDirectoryItem(plugin.handle, plugin.url_for(show_movies_section_list, "popularity"),
     #                  ListItem("Filmy - ostatnio oglądane"), True)
 
     endOfDirectory(plugin.handle)
@@ -109,40 +139,107 @@ def show_tv_series_list():
     xbmcplugin.setContent(_handle, 'tvshows')
 
     try:
-        for item in zalukaj.fetch_tv_series_list():
-            addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_seasons_list, b64encode(item['url'])),
-                             ListItem(item['title']), True)
+        items = catalog.fetch_tv_series_list()
+        notify_stale(items)
+        add_tv_series_items(items)
+    except ZalukajError as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+
+    endOfDirectory(plugin.handle)
+
+
+@plugin.route('/tv-series/letters')
+def show_tv_series_letters():
+    try:
+        index = tv_series_index()
+        addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_prefix),
+                         ListItem("[COLOR=gold]Przejdź do...[/COLOR]"), True)
+        for group, count in index.letters():
+            label = {DIGITS: "0-9", OTHER: "#"}.get(group, group)
+            addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_letter, group),
+                             ListItem("%s (%d)" % (label, count)), True)
+    except ZalukajError as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+
+    endOfDirectory(plugin.handle)
+
+
+@plugin.route('/tv-series/letter/<group>')
+def show_tv_series_letter(group):
+    xbmcplugin.setContent(_handle, 'tvshows')
+
+    try:
+        index = tv_series_index()
+        pages = index.pages(group)
+        if len(pages) > 1:
+            for page, (first, last) in enumerate(pages):
+                addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_letter_page, group, page),
+                                 ListItem(u"%s - %s" % (first, last)), True)
+        else:
+            add_tv_series_items(index.letter(group))
+    except ZalukajError as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+
+    endOfDirectory(plugin.handle)
+
+
+@plugin.route('/tv-series/letter/<group>/<page>')
+def show_tv_series_letter_page(group, page):
+    xbmcplugin.setContent(_handle, 'tvshows')
+
+    try:
+        add_tv_series_items(tv_series_index().letter(group, int(page)))
     except ZalukajError as e:
         notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
 
     endOfDirectory(plugin.handle)
 
 
-@plugin.route('/tv-series/seasons/<link_decoded>')
-def show_tv_series_seasons_list(link_decoded):
+@plugin.route('/tv-series/prefix')
+def show_tv_series_prefix():
+    xbmcplugin.setContent(_handle, 'tvshows')
+
+    prefix = xbmcgui.Dialog().input("Początek nazwy serialu", type=xbmcgui.INPUT_ALPHANUM)
+    if prefix:
+        try:
+            add_tv_series_items(tv_series_index().prefix(prefix.decode('utf-8')))
+        except ZalukajError as e:
+            notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+
+    endOfDirectory(plugin.handle)
+
+
+@plugin.route('/tv-series/seasons/<link_id>')
+def show_tv_series_seasons_list(link_id):
     xbmcplugin.setContent(_handle, 'seasons')
 
     try:
-        link = b64decode(link_decoded)
-        for item in zalukaj.fetch_tv_series_seasons_list(link):
+        link = ids.resolve(link_id)
+        items = catalog.fetch_tv_series_seasons_list(link)
+        notify_stale(items)
+        ids.register([item['url'] for item in items])
+        for item in items:
             list_item = ListItem(item['title'])
             list_item.setArt({"thumb": item['img'], "poster": item['img'], "banner": item['img'], "icon": item['img'],
                               "landscape": item['img'], "clearlogo": item['img'], "fanart": item['img']})
 
             addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_episodes_list,
-                                                           b64encode(item['url'])), list_item, True)
+                                                           ids.id_for(item['url'])), list_item, True)
     except ZalukajError as e:
         notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
     endOfDirectory(plugin.handle)
 
 
-@plugin.route('/tv-series/episodes/<link_decoded>')
-def show_tv_series_episodes_list(link_decoded):
+@plugin.route('/tv-series/episodes/<link_id>')
+def show_tv_series_episodes_list(link_id):
     xbmcplugin.setContent(_handle, 'episodes')
 
     try:
-        link = b64decode(link_decoded)
-        for item in zalukaj.fetch_tv_series_episodes_list(link):
+        link = ids.resolve(link_id)
+        items = catalog.fetch_tv_series_episodes_list(link)
+        notify_stale(items)
+        ids.register([item['url'] for item in items])
+        for item in items:
             list_item = ListItem(item['title'])
             list_item.setArt({"thumb": item['img'],
                               "poster": item['img'],
@@ -154,46 +251,143 @@ def show_tv_series_episodes_list(link_decoded):
             list_item.setInfo('video', {"season": item['season'], "episode": item['episode']})
             list_item.setProperty('IsPlayable', 'true')
 
-            addDirectoryItem(plugin.handle, plugin.url_for(play_movie, b64encode(item['url'])), list_item)
+            addDirectoryItem(plugin.handle, plugin.url_for(play_movie, ids.id_for(item['url'])), list_item)
     except ZalukajError as e:
         notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
     endOfDirectory(plugin.handle)
 
 
-@plugin.route('/play/<link_decoded>')
-def play_movie(link_decoded):
+@plugin.route('/play/<link_id>')
+def play_movie(link_id):
     xbmcplugin.setContent(_handle, 'movies')
 
     try:
-        link = b64decode(link_decoded)
-        data = zalukaj.fetch_movie_details(link)
-        streams = data['streams']
-        versions = data['versions']
-
-        if versions and len(versions) > 1:
-            selected_version = xbmcgui.Dialog().select("Wybór wersji wideo", [item['version'] for item in versions])
-            data = zalukaj.fetch_movie_from_player(versions[selected_version]['url'])
-            streams = data['streams']
+        link = ids.resolve(link_id)
+        streams = movie_streams(zalukaj.fetch_movie_details(link))
 
         if not streams or len(streams) == 0:
             notification(header='[COLOR red]Błąd odtwarzania[/COLOR]', message="Nie można odtworzyć filmu.", time=5000)
             setResolvedUrl(plugin.handle, False, ListItem(path=''))
+            return
 
-        movie_url = streams[0]['url']
+        quality = preferred_quality()
+        if data_video_probe:
+            streams = prober.rank(streams, quality)
+        else:
+            preferred = quality_height(quality) if quality else max(quality_height(s['quality']) for s in streams)
+            streams = sorted(streams, key=lambda s: quality_preference(s['quality'], preferred))
 
-        if len(streams) > 1:
-            selected_quality = xbmcgui.Dialog().select("Wybór jakości wideo", [item['quality'] for item in streams])
-            movie_url = streams[selected_quality]['url']
+        # Stable sort keeps ranking of streams within preferred version and the others
+        streams = sorted(streams, key=lambda s: not version_matches(s['version']))
+        stream = preferred_stream(streams)
 
-        setResolvedUrl(plugin.handle, True, ListItem(path=movie_url))
+        if stream is None and len(streams) > 1:
+            selected = xbmcgui.Dialog().select("Wybór wersji i jakości wideo", [stream_label(item) for item in streams])
+            if selected < 0:
+                setResolvedUrl(plugin.handle, False, ListItem(path=''))
+                return
+            stream = streams[selected]
+
+        setResolvedUrl(plugin.handle, True, ListItem(path=(stream or streams[0])['url']))
 
     except ZalukajError as e:
         notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+        setResolvedUrl(plugin.handle, False, ListItem(path=''))
+
+
+def movie_streams(data):
+    """
+    Resolve streams of all versions of movie at once. Streams of player page already fetched are reused when the page
+    is linked by one of versions, player pages of other versions are fetched concurrently.
+
+    :param data: dict | None - movie details returned by Zalukaj.fetch_movie_details
+    :return: list of dicts with quality, url and version (None when movie has single version)
+    """
+    if not data:
+        return []
+
+    versions = data['versions'] or []
+    if len(versions) <= 1:
+        return [dict(stream, version=None) for stream in data['streams']]
+
+    # Player opened from movie page is not linked by version buttons, so which version it shows is not known
+    current = data.get('version')
+    streams = [dict(stream, version=current) for stream in data['streams']] if current else []
+    players = [(version['version'], zalukaj_async.fetch_movie_from_player(version['url']))
+               for version in versions if version['version'] != current]
+    for version, future in players:
+        try:
+            player = future.result()
+        except ZalukajError as e:
+            logger.warning("Version %s was not resolved: %s", version, e)
+            continue
+
+        if player:
+            streams.extend(dict(stream, version=version) for stream in player['streams'])
+
+    return streams
+
+
+def preferred_quality():
+    """
+    :return: string | None - quality selected in video.quality setting
+    """
+    index = get_setting_as_int('video.quality') if data_video_quality else None
+    return VIDEO_QUALITIES[index] if index is not None and 0 <= index < len(VIDEO_QUALITIES) else None
+
+
+def preferred_version():
+    """
+    :return: string | None - version selected in video.version setting
+    """
+    index = get_setting_as_int('video.version') if data_video_version else None
+    return VIDEO_VERSIONS[index] if index is not None and 0 <= index < len(VIDEO_VERSIONS) else None
+
+
+def version_matches(version):
+    """
+    :param version: string | None - name of movie version, None when movie has single version
+    :return: bool - True when version is the preferred one or there is no choice
+    """
+    preferred = preferred_version()
+    return version is None or preferred is None or preferred.lower() in version.lower()
+
+
+def preferred_stream(streams):
+    """
+    :param streams: list of dicts with quality, url and version, the best ones first
+    :return: dict | None - the first stream of preferred version with quality not better than preferred one and
+        available host, None when there is no such stream
+    """
+    quality = preferred_quality()
+    for stream in streams:
+        if (version_matches(stream['version']) and stream.get('ttfb', 0) is not None
+                and (quality is None or quality_height(stream['quality']) <= quality_height(quality))):
+            return stream
+
+    return None
+
+
+def stream_label(stream):
+    """
+    :return: unicode - stream version and quality with measured host speed, if stream was probed
+    """
+    label = u"{} - {}".format(stream['version'], stream['quality']) if stream.get('version') else stream['quality']
+    if 'speed' not in stream:
+        return label
+
+    if stream['ttfb'] is None:
+        return u"{} (brak odpowiedzi)".format(label)
+
+    return u"{} ({:.1f} MB/s)".format(label, stream['speed'] / (1024 * 1024))
 
 
 @plugin.route('/account')
 def show_account():
-    user = zalukaj.fetch_user_data()
+    # Account page was checked when index was shown, it is fetched again only when no user is stored
+    user = zalukaj.stored_user()
+    if not user.is_logged():
+        user = zalukaj.fetch_user_data()
     if user.is_logged():
         addDirectoryItem(plugin.handle, "", ListItem("Hello user %s!" % user.name))
     endOfDirectory(plugin.handle)
@@ -203,11 +397,21 @@ def show_account():
 def show_movies_section_list(section):
     try:
         if section == "kind":
-            for item in zalukaj.fetch_movie_categories_list():
+            items = catalog.fetch_movie_categories_list()
+            notify_stale(items)
+            ids.register([item['url'] for item in items])
+            for item in items:
+                list_item = ListItem(item['title'])
+                list_item.addContextMenuItems([export_context_menu_item(
+                    plugin.url_for(export_movies, ids.id_for(item['url'])))])
                 addDirectoryItem(plugin.handle,
-                                 plugin.url_for(show_movies_list, b64encode(item['url'])),
-                                 ListItem(item['title']),
+                                 plugin.url_for(show_movies_list, ids.id_for(item['url'])),
+                                 list_item,
                                  True)
+        elif section == "latest":
+            xbmcplugin.setContent(_handle, 'movies')
+            order = ORDER_YEAR if get_setting_as_int('movies.latest_order') == 1 else ORDER_ADDED
+            add_movie_items(LatestAdditions(cache, zalukaj_async, ids, cached=catalog is cache).fetch(order))
 
     except ZalukajError as e:
         notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
@@ -215,39 +419,15 @@ def show_movies_section_list(section):
     endOfDirectory(plugin.handle)
 
 
-@plugin.route('/movies-list/<link_decoded>')
-def show_movies_list(link_decoded):
+@plugin.route('/movies-list/<link_id>')
+def show_movies_list(link_id):
     xbmcplugin.setContent(_handle, 'movies')
 
     try:
-        link = b64decode(link_decoded)
-        for item in zalukaj.fetch_movies_list(link):
-            list_item = ListItem(item['title'])
-            if 'img' in item:
-                list_item.setArt({"thumb": item['img'],
-                                  "poster": item['img'],
-                                  "banner": item['img'],
-                                  "icon": item['img'],
-                                  "landscape": item['img'],
-                                  "clearlogo": item['img'],
-                                  "fanart": item['img']})
-
-            if 'nav' not in item:
-                list_item.setProperty('IsPlayable', 'true')
-                list_item.setInfo('video', {
-                    "year": item.get('year', None),
-                    "plot": item.get('description', ''),
-                    "plotoutline": item.get('description', ''),
-                    "title": item['title'],
-                })
-                addDirectoryItem(plugin.handle,
-                                 plugin.url_for(play_movie, b64encode(item['url'])),
-                                 list_item)
-            else:
-                addDirectoryItem(plugin.handle,
-                                 plugin.url_for(show_movies_list, b64encode(item['url'])),
-                                 list_item,
-                                 True)
+        link = ids.resolve(link_id)
+        items = catalog.fetch_movies_list(link)
+        notify_stale(items)
+        add_movie_items(items)
     except ZalukajError as e:
         notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
     endOfDirectory(plugin.handle)
@@ -259,7 +439,9 @@ def show_search():
     try:
         search_phrase = xbmcgui.Dialog().input('Szukaj filmu', type=xbmcgui.INPUT_ALPHANUM)
         if search_phrase:
-            for item in zalukaj.search_movies(search_phrase):
+            items = zalukaj.search_movies(search_phrase)
+            ids.register([item['url'] for item in items])
+            for item in items:
                 list_item = ListItem(item['title'])
                 if 'img' in item:
                     list_item.setArt({"thumb": item['img'],
@@ -279,13 +461,13 @@ def show_search():
 
                 if item.get('tv_series') is True:
                     addDirectoryItem(plugin.handle,
-                                     plugin.url_for(show_tv_series_seasons_list, b64encode(item['url'])),
+                                     plugin.url_for(show_tv_series_seasons_list, ids.id_for(item['url'])),
                                      list_item,
                                      True)
                 else:
                     list_item.setProperty('IsPlayable', 'true')
                     addDirectoryItem(plugin.handle,
-                                     plugin.url_for(play_movie, b64encode(item['url'])),
+                                     plugin.url_for(play_movie, ids.id_for(item['url'])),
                                      list_item)
 
     except ZalukajError as e:
@@ -293,5 +475,166 @@ def show_search():
     endOfDirectory(plugin.handle)
 
 
+@plugin.route('/export/tv-series/<link_id>')
+def export_tv_series(link_id):
+    try:
+        link = ids.resolve(link_id)
+        title = tv_series_title(link)
+    except ZalukajError as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+        return
+
+    run_export(title, lambda exporter: exporter.export_tv_series(link, title))
+
+
+@plugin.route('/export/movies/<link_id>')
+def export_movies(link_id):
+    run_export("Filmy", lambda exporter: exporter.export_movies(ids.resolve(link_id)))
+
+
+@plugin.route('/catalog/export')
+def export_catalog():
+    if catalog is not cache:
+        notification(header='[COLOR red]Błąd[/COLOR]',
+                     message="Pamięć podręczna jest wyłączona, katalog jest pusty.", time=5000)
+        return
+
+    folder = xbmcgui.Dialog().browse(0, "Folder zapisu katalogu", 'files')
+    if not folder:
+        return
+
+    path = join(xbmc.translatePath(folder).decode('utf-8'), snapshot_name())
+    try:
+        count = CatalogSnapshot(cache).export(path)
+        notification(header='[COLOR green]Katalog zapisany[/COLOR]', message="Zapisane listy: %d" % count, time=5000)
+    except (IOError, OSError) as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=str(e), time=5000)
+
+
+@plugin.route('/catalog/import')
+def import_catalog():
+    path = xbmcgui.Dialog().browse(1, "Plik katalogu", 'files', '.gz')
+    if not path:
+        return
+
+    try:
+        stats = CatalogSnapshot(cache).load(xbmc.translatePath(path).decode('utf-8'))
+        notification(header='[COLOR green]Katalog wczytany[/COLOR]',
+                     message="Nowe: %d, pominięte: %d" % (stats['stored'], stats['listings'] - stats['stored']),
+                     time=5000)
+    except SnapshotError as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+
+
+def add_movie_items(items):
+    ids.register([item['url'] for item in items])
+    for item in items:
+        list_item = ListItem(item['title'])
+        if 'img' in item:
+            list_item.setArt({"thumb": item['img'],
+                              "poster": item['img'],
+                              "banner": item['img'],
+                              "icon": item['img'],
+                              "landscape": item['img'],
+                              "clearlogo": item['img'],
+                              "fanart": item['img']})
+
+        if 'nav' not in item:
+            list_item.setProperty('IsPlayable', 'true')
+            list_item.setInfo('video', {
+                "year": item.get('year', None),
+                "plot": item.get('description', ''),
+                "plotoutline": item.get('description', ''),
+                "title": item['title'],
+            })
+            addDirectoryItem(plugin.handle,
+                             plugin.url_for(play_movie, ids.id_for(item['url'])),
+                             list_item)
+        else:
+            addDirectoryItem(plugin.handle,
+                             plugin.url_for(show_movies_list, ids.id_for(item['url'])),
+                             list_item,
+                             True)
+
+
+def tv_series_index():
+    """
+    :return: SeriesIndex - index of tv series list from home page, taken from cache when it is enabled
+    """
+    index = cache.fetch_tv_series_index() if catalog is cache else SeriesIndex(zalukaj.fetch_tv_series_list())
+    notify_stale(index)
+    return index
+
+
+def tv_series_title(link):
+    """
+    :param link: string - canonical url of tv series
+    :return: string - title from tv series list, last part of url when tv series is not listed
+    """
+    for item in catalog.fetch_tv_series_list():
+        if canonical_url(item['url']) == link:
+            return item['title']
+
+    return link.rstrip('/').rsplit('/', 1)[-1]
+
+
+def add_tv_series_items(items):
+    ids.register([item['url'] for item in items])
+    for item in items:
+        list_item = ListItem(item['title'])
+        list_item.addContextMenuItems([export_context_menu_item(
+            plugin.url_for(export_tv_series, ids.id_for(item['url'])))])
+        addDirectoryItem(plugin.handle, plugin.url_for(show_tv_series_seasons_list, ids.id_for(item['url'])),
+                         list_item, True)
+
+
+def notify_stale(items):
+    """
+    Inform user that listing comes from cache, because it could not be refreshed on time.
+    """
+    if getattr(items, 'stale', False):
+        notification(header='[COLOR yellow]Zapisana lista[/COLOR]', message="Odświeżanie w tle.", time=2000,
+                     sound=False)
+
+
+def export_context_menu_item(url):
+    return "Eksportuj do biblioteki", "RunPlugin({})".format(url)
+
+
+def run_export(name, export):
+    """
+    Export items into library folder defined in settings and start library scan.
+
+    :param name: string - name of exported element displayed in progress
+    :param export: function - receives LibraryExporter and returns export stats
+    """
+    if not data_library_path:
+        notification(header='[COLOR red]Eksport[/COLOR]', message="Ustaw folder biblioteki w ustawieniach.", time=5000)
+        return
+
+    progress = xbmcgui.DialogProgressBG()
+    progress.create("Eksport do biblioteki", name)
+    try:
+        exporter = LibraryExporter(zalukaj_async,
+                                   data_library_path,
+                                   lambda link: plugin.url_for(play_movie, url_token(link)))
+        stats = export(exporter)
+        notification(header='[COLOR green]Eksport zakończony[/COLOR]',
+                     message="Nowe: %d, pominięte: %d" % (stats['written'], stats['skipped']),
+                     time=5000)
+        if stats['written']:
+            xbmc.executebuiltin('UpdateLibrary(video)')
+    except ZalukajError as e:
+        notification(header='[COLOR red]Błąd[/COLOR]', message=e.message, time=5000)
+    except (IOError, OSError) as e:
+        notification(header='[COLOR red]Błąd zapisu[/COLOR]', message=str(e), time=5000)
+    finally:
+        progress.close()
+
+
 def run():
-    plugin.run()
+    try:
+        plugin.run()
+    finally:
+        if not cache.wait(REFRESH_EXIT_TIMEOUT):
+            logger.warning("Background refresh of listings did not finish in %d s", REFRESH_EXIT_TIMEOUT)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+
+import mock
+import requests
+from resources.lib.fixtures import FixtureTestCase, corpus, kodi
+from resources.lib.ids import url_token
+
+
+class TestPluginRoutes(FixtureTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPluginRoutes, cls).setUpClass()
+        kodi.install(cls.data_path)
+        kodi.state['settings'] = {'zalukaj_login': 'true', 'zalukaj_username': 'tester', 'zalukaj_password': 'x',
+                                  'video.quality': '0', 'video.version': '0', 'video.probe': 'true',
+                                  'debug': 'false'}
+        sys.modules.pop('resources.lib.plugin', None)
+        from resources.lib import plugin
+        cls.plugin = plugin
+
+    def setUp(self):
+        super(TestPluginRoutes, self).setUp()
+        del kodi.events[:]
+        kodi.state['select'] = 0
+
+    def directory(self):
+        self.assertEqual(kodi.last_event('endOfDirectory', 'setResolvedUrl')[1], 'endOfDirectory')
+        self.assertEqual([event for event in kodi.events
+                          if event[1] == 'notification' and 'red' in event[2]['heading']], [])
+        return [event[2] for event in kodi.events if event[1] == 'addDirectoryItem']
+
+    def test_index(self):
+        self.plugin.index()
+        self.assertEqual(len(self.directory()), 6)
+
+    def test_account_is_served_from_stored_user(self):
+        self.plugin.index()
+        del kodi.events[:]
+        del self.server.requests[:]
+
+        self.plugin.show_account()
+        self.assertEqual(len(self.directory()), 1)
+        self.assertEqual(self.server.requests, [])
+
+    def test_tv_series(self):
+        self.plugin.show_tv_series_list()
+        series = self.directory()
+        self.assertEqual(len(series), len(corpus.SERIES_NAMES))
+
+        del kodi.events[:]
+        self.plugin.plugin.run([series[0]['url']])
+        seasons = self.directory()
+        self.assertEqual(len(seasons), corpus.SEASONS)
+
+        del kodi.events[:]
+        self.plugin.plugin.run([seasons[0]['url']])
+        episodes = self.directory()
+        self.assertEqual(len(episodes), corpus.EPISODES)
+        self.assertEqual(episodes[0]['item'].properties['IsPlayable'], 'true')
+
+    def test_tv_series_letters(self):
+        self.plugin.show_tv_series_letters()
+        letters = self.directory()
+        self.assertEqual(letters[1]['item'].label, '0-9 (1)')
+
+        del kodi.events[:]
+        self.plugin.plugin.run([[letter['url'] for letter in letters if letter['item'].label == 'S (3)'][0]])
+        self.assertEqual(len(self.directory()), 3)
+
+        del kodi.events[:]
+        kodi.state['input'] = 'Żyw'
+        self.plugin.plugin.run([letters[0]['url']])
+        self.assertEqual([item['item'].label for item in self.directory()], [u'Żywioł'])
+
+    def test_latest_movies(self):
+        self.plugin.show_movies_section_list('latest')
+        movies = self.directory()
+        self.assertGreater(len(movies), 0)
+        self.assertEqual(movies[0]['item'].properties['IsPlayable'], 'true')
+
+    def test_legacy_route(self):
+        self.plugin.plugin.run(['plugin://plugin.video.zalukaj/tv-series/seasons/{}'.format(
+            '/serial/futurama-501.html'.encode('base64').strip())])
+        self.assertEqual(len(self.directory()), corpus.SEASONS)
+
+    def play_movie(self, settings):
+        movie_id, title = corpus.MOVIES[0][0:2]
+        with mock.patch.dict(kodi.state['settings'], settings):
+            self.plugin.play_movie(self.plugin.ids.id_for(corpus.movie_url(self.server.url, movie_id, title)))
+
+        resolved = kodi.last_event('setResolvedUrl')[2]
+        self.assertTrue(resolved['succeeded'])
+        return movie_id, resolved['path']
+
+    def selects(self):
+        return [event[2] for event in kodi.events if event[1] == 'select']
+
+    def test_play_movie_preferred_version_and_quality(self):
+        del self.server.requests[:]
+        movie_id, path = self.play_movie({})
+        self.assertEqual(path, corpus.stream_url(self.server.url, movie_id, 0, corpus.QUALITIES[0]))
+        self.assertEqual(self.selects(), [])
+        # player opened from movie page is not linked by version buttons, so every version is fetched
+        self.assertEqual(self.server.requests.count('/player.php'), 1 + len(corpus.VERSIONS))
+
+        del kodi.events[:]
+        movie_id, path = self.play_movie({'video.version': '1', 'video.quality': '5'})
+        self.assertEqual(path, corpus.stream_url(self.server.url, movie_id, 1, corpus.QUALITIES[1]))
+        self.assertEqual(self.selects(), [])
+
+    def test_streams_of_linked_player_page_are_reused(self):
+        movie_id = corpus.MOVIES[0][0]
+        data = self.plugin.zalukaj.fetch_movie_from_player('/player.php?w={}&v=1&x=1'.format(movie_id))
+        self.assertEqual(data['version'], corpus.VERSIONS[1])
+
+        del self.server.requests[:]
+        streams = self.plugin.movie_streams(data)
+        self.assertEqual(self.server.requests, ['/player.php'] * (len(corpus.VERSIONS) - 1))
+        self.assertEqual(sorted(set(stream['version'] for stream in streams)), sorted(corpus.VERSIONS))
+        self.assertIn(dict(data['streams'][0], version=corpus.VERSIONS[1]), streams)
+
+    def test_play_movie_without_match(self):
+        kodi.state['select'] = 1
+        movie_id, path = self.play_movie({'video.version': '2'})
+
+        items = self.selects()[0]['items']
+        self.assertEqual(len(items), len(corpus.VERSIONS) * len(corpus.QUALITIES))
+        self.assertIn('Napisy PL', items[1])
+        self.assertIn('MB/s', items[1])
+        self.assertEqual(path, corpus.stream_url(self.server.url, movie_id, 1, corpus.QUALITIES[0]))
+
+    def test_play_from_library_link(self):
+        movie_id, title = corpus.MOVIES[0][0:2]
+        self.plugin.play_movie(url_token(corpus.movie_url(self.server.url, movie_id, title)))
+        self.assertTrue(kodi.last_event('setResolvedUrl')[2]['succeeded'])
+
+    def test_play_unknown_id(self):
+        self.plugin.play_movie('abcdefghij')
+        self.assertIn('red', kodi.last_event('notification')[2]['heading'])
+        self.assertFalse(kodi.last_event('setResolvedUrl')[2]['succeeded'])
+
+    def test_play_movie_without_connection(self):
+        movie_id, title = corpus.MOVIES[1][0:2]
+        with mock.patch.object(self.plugin.zalukaj.session, 'request', side_effect=requests.ConnectionError()):
+            self.plugin.play_movie(self.plugin.ids.id_for(corpus.movie_url(self.server.url, movie_id, title)))
+
+        self.assertIn('red', kodi.last_event('notification')[2]['heading'])
+        self.assertFalse(kodi.last_event('setResolvedUrl')[2]['succeeded'])
+
+    def export_tv_series(self, library_path, title):
+        self.plugin.show_tv_series_list()
+        item = [event['item'] for event in self.directory() if event['item'].label == title][0]
+        url = re.match(r'^RunPlugin\((.*)\)$', item.context_menu[0][1]).group(1)
+
+        del kodi.events[:]
+        with mock.patch.object(self.plugin, 'data_library_path', library_path):
+            self.plugin.plugin.run([url])
+        return kodi.last_event('notification')[2]['heading']
+
+    def test_export_tv_series(self):
+        folder = self.mkdtemp()
+        self.assertIn('green', self.export_tv_series(folder, corpus.SERIES_NAMES[3]))
+        self.assertTrue(os.path.isdir(os.path.join(folder, u'Seriale', corpus.SERIES_NAMES[3]).encode('utf-8')))
+
+        blocked = os.path.join(folder, 'file')
+        open(blocked, 'w').close()
+        self.assertIn('red', self.export_tv_series(blocked, corpus.SERIES_NAMES[0]))
+
+    def test_catalog_snapshot(self):
+        self.plugin.cache.fetch_movie_categories_list()
+        folder = self.mkdtemp()
+        kodi.state['browse'] = folder
+        with mock.patch.object(self.plugin, 'catalog', self.plugin.cache):
+            self.plugin.export_catalog()
+        path = os.path.join(folder, os.listdir(folder)[0])
+        self.assertIn('green', kodi.last_event('notification')[2]['heading'])
+
+        kodi.state['browse'] = path
+        self.plugin.import_catalog()
+        self.assertIn('green', kodi.last_event('notification')[2]['heading'])
+
+    def test_catalog_export_without_cache(self):
+        folder = self.mkdtemp()
+        kodi.state['browse'] = folder
+        with mock.patch.object(self.plugin, 'catalog', self.plugin.zalukaj):
+            self.plugin.export_catalog()
+        self.assertIn('red', kodi.last_event('notification')[2]['heading'])
+        self.assertEqual(os.listdir(folder), [])
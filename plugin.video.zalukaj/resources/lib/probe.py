@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import time
+from urlparse import urlparse
+
+import requests
+from resources.lib.workers import WorkerPool
+
+""" Values of video.quality setting, in the same order """
+VIDEO_QUALITIES = ['4K', '2160p', '1440p', '1080p', '720p', '480p', '360p', '240p']
+
+""" Seconds after which probing of all streams ends, not answered streams are treated as dead """
+PROBE_DEADLINE = 1.5
+
+""" Bytes read from every stream to measure throughput """
+PROBE_SAMPLE_SIZE = 64 * 1024
+
+""" Seconds for which measurement of host is used instead of probing it again """
+HOST_RESULT_TTL = 6 * 3600
+
+""" Seconds for which host is treated as dead after failed probe, it could only miss deadline on cold connection """
+FAILED_HOST_TTL = 5 * 60
+
+""" Approximate bytes per second needed to play stream of given height without buffering """
+REQUIRED_SPEED = [(2160, 2500 * 1024), (1440, 1200 * 1024), (1080, 600 * 1024), (720, 300 * 1024),
+                  (480, 150 * 1024), (0, 80 * 1024)]
+
+logger = logging.getLogger(__name__)
+
+
+def quality_height(quality):
+    """
+    :param quality: string - stream label, like 720p or 4K
+    :return: int - number of lines, 0 when unknown
+    """
+    if quality and quality.upper() == '4K':
+        return 2160
+
+    match = re.search('([0-9]+)p', quality or '')
+    return int(match.group(1)) if match else 0
+
+
+def quality_preference(quality, preferred):
+    """
+    :param quality: string - stream label
+    :param preferred: int - number of lines of preferred quality
+    :return: tuple - sort key, qualities up to preferred one from the best, then better ones from the closest
+    """
+    height = quality_height(quality)
+    return (0, -height) if height <= preferred else (1, height)
+
+
+def required_speed(height):
+    return next(speed for lines, speed in REQUIRED_SPEED if height >= lines)
+
+
+class StreamProber(object):
+    """
+    Measures time to first byte and throughput of stream hosts, to start the best stream without asking user.
+
+    All streams are probed concurrently with ranged requests, probing ends after deadline.
+    Results are kept per host, so next plays from the same host are not probed until results expire.
+    """
+
+    def __init__(self, storage, session=None, pool=None, deadline=PROBE_DEADLINE, sample_size=PROBE_SAMPLE_SIZE,
+                 ttl=HOST_RESULT_TTL, failed_ttl=FAILED_HOST_TTL):
+        """
+        :param storage: Storage
+        :param session: requests.Session - session used to download samples, shared with Zalukaj for its cookies
+        :param pool: WorkerPool
+        """
+        self.storage = storage
+        self.session = session if session else requests.Session()
+        self.pool = pool if pool else WorkerPool()
+        self.deadline = deadline
+        self.sample_size = sample_size
+        self.ttl = ttl
+        self.failed_ttl = failed_ttl
+        self.storage.schema('CREATE TABLE IF NOT EXISTS stream_hosts ('
+                            'host TEXT PRIMARY KEY, ttfb REAL, speed REAL NOT NULL, probed_at REAL NOT NULL)')
+
+    def probe(self, urls):
+        """
+        Measure hosts of given stream urls, hosts with fresh results are not probed.
+
+        :param urls: list of strings
+        :return: dict host: dict with:
+            ttfb: float | None - seconds to first byte, None when host did not answer
+            speed: float - bytes per second, 0 when host did not answer
+        """
+        results = self.host_results([urlparse(url).netloc for url in urls])
+        probes = {}
+        for url in urls:
+            host = urlparse(url).netloc
+            if host not in results and host not in probes:
+                probes[host] = self.pool.submit(self._probe, url, time.time() + self.deadline)
+
+        end = time.time() + self.deadline
+        for host, future in probes.items():
+            try:
+                results[host] = future.result(max(0, end - time.time()))
+            except (RuntimeError, requests.RequestException) as e:
+                logger.info("Stream host %s failed probe: %s", host, e)
+                results[host] = {'ttfb': None, 'speed': 0}
+
+        probed_at = time.time()
+        with self.storage.transaction() as cursor:
+            for host in probes:
+                cursor.execute('INSERT OR REPLACE INTO stream_hosts (host, ttfb, speed, probed_at) '
+                               'VALUES (?, ?, ?, ?)', (host, results[host]['ttfb'], results[host]['speed'], probed_at))
+
+        return results
+
+    def host_results(self, hosts):
+        """
+        :return: dict host: dict with ttfb and speed, only for hosts with not expired results, failed probes expire
+            after failed_ttl
+        """
+        results = {}
+        now = time.time()
+        for host in set(hosts):
+            row = self.storage.fetch_one('SELECT ttfb, speed FROM stream_hosts WHERE host = ? AND probed_at >= '
+                                         'CASE WHEN ttfb IS NULL THEN ? ELSE ? END',
+                                         (host, now - self.failed_ttl, now - self.ttl))
+            if row:
+                results[host] = {'ttfb': row[0], 'speed': row[1]}
+
+        return results
+
+    def rank(self, streams, quality=None):
+        """
+        Sort streams from the best one to start. Streams which host did not answer are last, then streams too slow
+        for their quality. Remaining ones are sorted by preferred quality - the best quality not better than
+        preferred one, and then by speed of host.
+
+        :param streams: list of dicts with quality and url, as returned by Zalukaj.fetch_movie_from_player
+        :param quality: string | None - preferred quality, one of VIDEO_QUALITIES
+        :return: list of dicts with quality, url, ttfb and speed
+        """
+        results = self.probe([stream['url'] for stream in streams])
+        preferred = quality_height(quality) if quality else max(quality_height(s['quality']) for s in streams)
+
+        ranked = []
+        for stream in streams:
+            result = results[urlparse(stream['url']).netloc]
+            ranked.append(dict(stream, ttfb=result['ttfb'], speed=result['speed']))
+
+        return sorted(ranked, key=lambda s: (s['ttfb'] is None,
+                                             s['speed'] < required_speed(quality_height(s['quality'])),
+                                             quality_preference(s['quality'], preferred),
+                                             -s['speed']))
+
+    def _probe(self, url, deadline):
+        start = time.time()
+        response = self.session.get(url, headers={'Range': 'bytes=0-{}'.format(self.sample_size - 1)}, stream=True,
+                                    timeout=max(0.1, deadline - start))
+        try:
+            response.raise_for_status()
+            ttfb = time.time() - start
+            size = 0
+            for chunk in response.iter_content(8 * 1024):
+                size += len(chunk)
+                if size >= self.sample_size or time.time() >= deadline:
+                    break
+
+            return {'ttfb': ttfb, 'speed': size / max(time.time() - start - ttfb, 0.001)}
+        finally:
+            response.close()
@@ -0,0 +1,68 @@
+import unittest
+from urlparse import urlparse
+
+from resources.lib.fixtures import FixtureTestCase, corpus
+from resources.lib.probe import StreamProber, FAILED_HOST_TTL, quality_height
+from resources.lib.storage import Storage
+
+
+class TestStreamProber(FixtureTestCase):
+
+    def setUp(self):
+        super(TestStreamProber, self).setUp()
+        self.storage = Storage(self.mkdtemp())
+        self.prober = StreamProber(self.storage, deadline=0.5)
+        # The same stand-in under two host names, so results are kept for two hosts
+        self.other_url = self.server.url.replace('127.0.0.1', 'localhost')
+
+    def tearDown(self):
+        self.storage.close()
+
+    def streams(self, *qualities):
+        return [{'quality': quality, 'url': corpus.stream_url(self.server.url, 1, 0, quality)} for quality in qualities]
+
+    def test_quality_height(self):
+        self.assertEqual([quality_height(quality) for quality in ['4K', '1080p', 'HD', None]], [2160, 1080, 0, 0])
+
+    def test_preferred_quality_first(self):
+        ranked = self.prober.rank(self.streams('2160p', '480p', '720p'), '1080p')
+        self.assertEqual([stream['quality'] for stream in ranked], ['720p', '480p', '2160p'])
+        self.assertTrue(all(stream['speed'] > 0 for stream in ranked))
+
+        self.assertEqual([stream['quality'] for stream in self.prober.rank(self.streams('480p', '720p'))],
+                         ['720p', '480p'])
+
+    def test_dead_host_is_last(self):
+        self.server.stream_delays = {'-720p': 2}
+        streams = self.streams('480p') + [{'quality': '720p',
+                                           'url': corpus.stream_url(self.other_url, 1, 0, '720p')}]
+
+        ranked = self.prober.rank(streams, '720p')
+        self.assertEqual([stream['quality'] for stream in ranked], ['480p', '720p'])
+        self.assertIsNone(ranked[1]['ttfb'])
+
+    def test_failed_probe_expires_early(self):
+        self.server.stream_delays = {'-720p': 2}
+        self.prober.rank(self.streams('720p'))
+        host = urlparse(self.server.url).netloc
+        self.assertEqual(self.prober.host_results([host]), {host: {'ttfb': None, 'speed': 0}})
+
+        self.storage.execute('UPDATE stream_hosts SET probed_at = probed_at - ?', (FAILED_HOST_TTL + 1,))
+        self.assertEqual(self.prober.host_results([host]), {})
+
+        self.server.stream_delays = {}
+        self.prober.rank(self.streams('720p'))
+        self.storage.execute('UPDATE stream_hosts SET probed_at = probed_at - ?', (FAILED_HOST_TTL + 1,))
+        self.assertIn(host, self.prober.host_results([host]))
+
+    def test_host_results_are_reused(self):
+        self.prober.rank(self.streams('720p', '480p'))
+        self.assertEqual(len([path for path in self.server.requests if path.startswith('/stream/')]), 1)
+
+        del self.server.requests[:]
+        StreamProber(self.storage).rank(self.streams('720p', '480p'))
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import unicodedata
+from bisect import bisect_left
+from itertools import groupby
+
+""" Letters not decomposed by unicode normalization """
+TRANSLITERATION = {u'ł': u'l', u'ø': u'o', u'đ': u'd', u'ß': u'ss'}
+
+""" Group of titles starting with digit """
+DIGITS = u'0'
+
+""" Group of titles starting with other character than latin letter or digit """
+OTHER = u'_'
+
+""" Maximum number of tv series in single directory, larger letter groups are split into pages """
+PAGE_SIZE = 100
+
+""" Sorts after any character of normalized title """
+MAX_CHARACTER = u'\uffff'
+
+
+def normalize(title):
+    """
+    Make key used to sort and search titles: lowercase, without diacritics and leading punctuation.
+
+    :param title: string | unicode
+    :return: unicode
+    """
+    if isinstance(title, bytes):
+        title = title.decode('utf-8')
+
+    title = u''.join(TRANSLITERATION.get(character, character) for character in title.lower())
+    title = u''.join(character for character in unicodedata.normalize('NFKD', title)
+                     if not unicodedata.combining(character))
+
+    start = 0
+    while start < len(title) and not title[start].isalnum():
+        start += 1
+
+    return title[start:]
+
+
+def letter(key):
+    """
+    :param key: unicode - normalized title
+    :return: unicode - uppercase latin letter, DIGITS or OTHER
+    """
+    first = key[0:1]
+    if first.isdigit():
+        return DIGITS
+
+    return first.upper() if u'a' <= first <= u'z' else OTHER
+
+
+class SeriesIndex(object):
+    """
+    Tv series sorted by normalized first letter and title.
+
+    Index is built once from tv series list, letter groups, their pages and titles starting with prefix are then
+    slices found by binary search. Sorted keys can be stored and passed again with the same list, so titles are not
+    normalized and sorted on every view.
+
+    stale: bool - True when tv series list comes from cache and is refreshed in background
+    """
+
+    def __init__(self, items, keys=None, stale=False):
+        """
+        :param items: list of dicts with url and title, as returned by Zalukaj.fetch_tv_series_list
+        :param keys: list of [letter, normalized title, position in items] sorted, `keys` of index built from the same
+            items, None to build them
+        :param stale: bool
+        """
+        if keys is None:
+            keys = sorted([letter(key), key, position]
+                          for position, key in enumerate(normalize(item['title']) for item in items))
+
+        self.keys = keys
+        self.stale = stale
+        self._keys = [(group, key) for group, key, _ in keys]
+        self._items = [items[position] for _, _, position in keys]
+
+    def __len__(self):
+        return len(self._items)
+
+    def letters(self):
+        """
+        :return: list of tuples (letter, number of tv series), DIGITS first and OTHER last
+        """
+        return [(group, len(list(keys))) for group, keys in groupby(group for group, _ in self._keys)]
+
+    def letter(self, group, page=None, page_size=PAGE_SIZE):
+        """
+        :param group: unicode - letter returned by letters
+        :param page: int | None - number of page starting from 0, None for the whole group
+        :return: list of dicts with url and title
+        """
+        start, end = self._bounds(group, u'')
+        if page is not None:
+            start, end = start + page * page_size, min(end, start + (page + 1) * page_size)
+
+        return self._items[start:end]
+
+    def pages(self, group, page_size=PAGE_SIZE):
+        """
+        :return: list of tuples (first title, last title) of every page of letter group
+        """
+        start, end = self._bounds(group, u'')
+        return [(self._items[first]['title'], self._items[min(end, first + page_size) - 1]['title'])
+                for first in range(start, end, page_size)]
+
+    def prefix(self, text):
+        """
+        :param text: string | unicode - beginning of title, compared without case and diacritics
+        :return: list of dicts with url and title, empty when text has no letter or digit
+        """
+        key = normalize(text)
+        if not key:  # nothing but punctuation, there is no beginning of title to look for
+            return []
+
+        start, end = self._bounds(letter(key), key)
+        return self._items[start:end]
+
+    def _bounds(self, group, key):
+        return (bisect_left(self._keys, (group, key)),
+                bisect_left(self._keys, (group, key + MAX_CHARACTER)))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import unittest
+
+from resources.lib.fixtures import corpus
+from resources.lib.series_index import SeriesIndex, DIGITS, OTHER, normalize
+
+
+class TestSeriesIndex(unittest.TestCase):
+
+    def setUp(self):
+        items = [{'url': corpus.series_url(series_id, slug), 'title': name}
+                 for series_id, slug, name in corpus.series()]
+        self.index = SeriesIndex(items + [{'url': '/serial/allo-allo-1.html', 'title': u"'Allo 'Allo!"},
+                                          {'url': '/serial/yo-2.html', 'title': u'ヨ'}])
+
+    def titles(self, items):
+        return [item['title'] for item in items]
+
+    def test_normalize(self):
+        self.assertEqual(normalize(u'Łowcy skarbów'), u'lowcy skarbow')
+        self.assertEqual(normalize('Żywioł'), u'zywiol')
+        self.assertEqual(normalize(u"'Allo 'Allo!"), u"allo 'allo!")
+
+    def test_letters(self):
+        letters = dict(self.index.letters())
+        self.assertEqual(self.index.letters()[0], (DIGITS, 1))
+        self.assertEqual(self.index.letters()[-1], (OTHER, 1))
+        self.assertEqual(letters['S'], 3)
+        self.assertEqual(sum(letters.values()), len(self.index))
+
+    def test_letter_is_sorted_without_diacritics(self):
+        self.assertEqual(self.titles(self.index.letter('S')), ['Simpsonowie', 'Ślepnąc od świateł', 'Stranger Things'])
+        self.assertEqual(self.titles(self.index.letter('A')), [u"'Allo 'Allo!", 'Ania, nie Anna'])
+        self.assertEqual(self.index.letter('Q'), [])
+
+    def test_pages(self):
+        self.assertEqual(self.index.pages('S', page_size=2),
+                         [('Simpsonowie', 'Ślepnąc od świateł'), ('Stranger Things', 'Stranger Things')])
+        self.assertEqual(self.titles(self.index.letter('S', 1, page_size=2)), ['Stranger Things'])
+
+    def test_prefix(self):
+        self.assertEqual(self.titles(self.index.prefix(u'SLE')), ['Ślepnąc od świateł'])
+        self.assertEqual(self.titles(self.index.prefix(u'ło')), ['Łowcy skarbów'])
+        self.assertEqual(self.index.prefix(u'zzz'), [])
+        self.assertEqual(self.index.prefix(u''), [])
+        self.assertEqual(self.index.prefix(u"'!? "), [])
+
+    def test_stored_keys(self):
+        items = [{'url': '/serial/{}.html'.format(number), 'title': title}
+                 for number, title in enumerate([u'Żywioł', u'zoo', u'Alf', u'Zoo'])]
+        index = SeriesIndex(items)
+        self.assertEqual(self.titles(index.letter('Z')), [u'zoo', u'Zoo', u'Żywioł'])
+
+        stored = SeriesIndex(items, keys=json.loads(json.dumps(index.keys)))
+        self.assertEqual(stored.letters(), index.letters())
+        self.assertEqual(stored.letter('Z'), index.letter('Z'))
+        self.assertEqual(stored.prefix(u'zo'), index.prefix(u'zo'))
+
+
+if __name__ == '__main__':
+    unittest.main()
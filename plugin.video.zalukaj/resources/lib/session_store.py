@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import time
+from cookielib import Cookie, CookieJar, LWPCookieJar, LoadError
+
+""" Cookie attributes kept in attributes column, besides domain, path, name, value and expires """
+COOKIE_ATTRIBUTES = ['version', 'port', 'port_specified', 'domain_specified', 'domain_initial_dot', 'path_specified',
+                     'secure', 'discard', 'comment', 'comment_url', 'rfc2109']
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(object):
+    """
+    Session cookies and client state shared by plugin and service processes.
+
+    Rows are kept in `Storage` (SQLite in WAL mode), so readers do not wait for writers, single cookie or state key is
+    read without loading the rest and every update (cookies together with state) is one transaction.
+    """
+
+    def __init__(self, storage):
+        """
+        :param storage: Storage
+        """
+        self.storage = storage
+        self.storage.schema(
+            'CREATE TABLE IF NOT EXISTS cookies (domain TEXT NOT NULL, path TEXT NOT NULL, name TEXT NOT NULL, '
+            'value TEXT, expires INTEGER, attributes TEXT NOT NULL, PRIMARY KEY (domain, path, name))',
+            'CREATE TABLE IF NOT EXISTS session_state (key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'updated_at REAL NOT NULL)')
+
+    def cookies(self):
+        """
+        :return: list of cookielib.Cookie - stored cookies which did not expire
+        """
+        return [self._cookie(row) for row in self.storage.fetch_all(
+            'SELECT domain, path, name, value, expires, attributes FROM cookies '
+            'WHERE expires IS NULL OR expires > ?', (int(time.time()),))]
+
+    def cookie(self, name):
+        """
+        :param name: string - cookie name
+        :return: string | None - value of stored cookie which did not expire
+        """
+        row = self.storage.fetch_one('SELECT value FROM cookies WHERE name = ? AND (expires IS NULL OR expires > ?)',
+                                     (name, int(time.time())))
+        return row[0] if row else None
+
+    def get(self, key, max_age=None):
+        """
+        :param key: string - state name
+        :param max_age: int | None - seconds, older state is ignored
+        :return: state decoded from JSON or None when it is not stored
+        """
+        row = self.storage.fetch_one('SELECT value, updated_at FROM session_state WHERE key = ?', (key,))
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+
+        return json.loads(row[0])
+
+    def update(self, cookies=None, **state):
+        """
+        Store cookies and state in single transaction.
+
+        :param cookies: iterable of cookielib.Cookie | None - replace all stored cookies, None keeps them
+        :param state: values serializable to JSON, None removes key
+        """
+        now = time.time()
+        with self.storage.transaction() as cursor:
+            if cookies is not None:
+                cursor.execute('DELETE FROM cookies')
+                self._insert(cursor, cookies)
+
+            for key, value in state.items():
+                if value is None:
+                    cursor.execute('DELETE FROM session_state WHERE key = ?', (key,))
+                else:
+                    cursor.execute('INSERT OR REPLACE INTO session_state (key, value, updated_at) VALUES (?, ?, ?)',
+                                   (key, json.dumps(value), now))
+
+    def migrate(self, path):
+        """
+        Move cookies from LWPCookieJar file of previous versions into store and remove the file.
+        Cookies already in store are newer, so file is then only removed.
+
+        :param path: string - cookies file
+        :return: int - number of migrated cookies
+        """
+        if not os.path.isfile(path):
+            return 0
+
+        jar = LWPCookieJar(path)
+        try:
+            jar.load(ignore_discard=True)
+        except (IOError, LoadError) as e:
+            logger.warning("Cookies file %s was not migrated: %s", path, e)
+
+        migrated = 0
+        with self.storage.transaction() as cursor:
+            if cursor.execute('SELECT COUNT(*) FROM cookies').fetchone()[0] == 0:
+                migrated = self._insert(cursor, jar)
+
+        try:
+            os.remove(path)
+        except OSError:  # already migrated by another process
+            pass
+
+        return migrated
+
+    @staticmethod
+    def _insert(cursor, cookies):
+        rows = [(cookie.domain, cookie.path, cookie.name, cookie.value, cookie.expires,
+                 json.dumps(dict([(attribute, getattr(cookie, attribute)) for attribute in COOKIE_ATTRIBUTES],
+                                 rest=cookie._rest)))
+                for cookie in cookies]
+        cursor.executemany('INSERT OR REPLACE INTO cookies (domain, path, name, value, expires, attributes) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    @staticmethod
+    def _cookie(row):
+        domain, path, name, value, expires, attributes = row
+        return Cookie(name=name, value=value, domain=domain, path=path, expires=expires, **json.loads(attributes))
+
+
+class StoredCookieJar(CookieJar):
+    """
+    Cookie jar of requests session loaded from and saved to SessionStore, replaces LWPCookieJar file.
+    """
+
+    def __init__(self, store):
+        """
+        :param store: SessionStore
+        """
+        CookieJar.__init__(self)
+        self.store = store
+        self.load()
+
+    def load(self):
+        """
+        Replace cookies of jar with stored ones.
+        """
+        self.clear()
+        for cookie in self.store.cookies():
+            self.set_cookie(cookie)
+
+    def save(self, **state):
+        """
+        Replace stored cookies with cookies of jar, together with given session state in single transaction.
+
+        :param state: state passed to SessionStore.update
+        """
+        self.store.update(cookies=list(self), **state)
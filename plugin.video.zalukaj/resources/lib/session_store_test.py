@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+import unittest
+from cookielib import LWPCookieJar, Cookie
+from urlparse import urlparse
+
+from resources.lib.fixtures import FixtureTestCase
+from resources.lib.fixtures.server import SESSION_ID
+from resources.lib.session_store import SessionStore
+from resources.lib.storage import Storage
+from resources.lib.zalukaj import Zalukaj, FILE_COOKIES_NAME, SESSION_COOKIE_NAME
+
+
+def cookie(name, value, domain, expires=None):
+    return Cookie(version=0, name=name, value=value, port=None, port_specified=False, domain=domain,
+                  domain_specified=False, domain_initial_dot=False, path='/', path_specified=True, secure=False,
+                  expires=expires, discard=expires is None, comment=None, comment_url=None, rest={})
+
+
+class TestSessionStore(FixtureTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestSessionStore, cls).setUpClass()
+        cls.host = urlparse(cls.server.url).hostname
+
+    def setUp(self):
+        super(TestSessionStore, self).setUp()
+        self.data_path = self.mkdtemp()
+        self.storages = []
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+
+    def store(self):
+        """
+        :return: SessionStore with own connection, like store of another process
+        """
+        storage = Storage(self.data_path)
+        self.storages.append(storage)
+        return SessionStore(storage)
+
+    def client(self):
+        return Zalukaj(self.data_path, store=self.store())
+
+    def test_login_is_shared(self):
+        user = self.client().login('tester', 'x')
+        self.assertTrue(user.is_logged())
+
+        other = self.client()
+        self.assertEqual(other.store.cookie(SESSION_COOKIE_NAME), SESSION_ID)
+        self.assertEqual(other.store.get('user'), user.state())
+
+        del self.server.requests[:]
+        self.assertEqual(other.stored_user().name, user.name)
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(other.fetch_user_data().name, user.name)
+
+    def test_expired_session_removes_user(self):
+        store = self.store()
+        store.update(cookies=[cookie(SESSION_COOKIE_NAME, 'expired', self.host)],
+                     user={'name': 'tester', 'account_type': 'konto vip'})
+
+        self.assertFalse(self.client().fetch_user_data().is_logged())
+        self.assertIsNone(store.get('user'))
+
+    def test_logout(self):
+        client = self.client()
+        client.login('tester', 'x')
+        client.logout()
+
+        other = self.client()
+        self.assertIsNone(other.store.cookie(SESSION_COOKIE_NAME))
+        self.assertIsNone(other.store.get('user'))
+        self.assertFalse(other.stored_user().is_logged())
+        self.assertFalse(other.fetch_user_data().is_logged())
+
+    def test_migration_of_cookie_file(self):
+        path = os.path.join(self.data_path, FILE_COOKIES_NAME)
+        jar = LWPCookieJar(path)
+        jar.set_cookie(cookie(SESSION_COOKIE_NAME, SESSION_ID, self.host, expires=int(time.time()) + 3600))
+        jar.save()
+
+        client = self.client()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(client.store.cookie(SESSION_COOKIE_NAME), SESSION_ID)
+        self.assertTrue(client.fetch_user_data().is_logged())
+
+        jar.set_cookie(cookie(SESSION_COOKIE_NAME, 'old', self.host, expires=int(time.time()) + 3600))
+        jar.save()
+        self.assertEqual(self.store().migrate(path), 0)
+        self.assertEqual(client.store.cookie(SESSION_COOKIE_NAME), SESSION_ID)
+
+    def test_partial_reads(self):
+        store = self.store()
+        store.update(cookies=[cookie('a', '1', self.host), cookie('b', '2', self.host, expires=int(time.time()) - 1)],
+                     user={'name': 'tester', 'account_type': 'vip'})
+
+        self.assertEqual(store.cookie('a'), '1')
+        self.assertIsNone(store.cookie('b'))
+        self.assertEqual([c.name for c in store.cookies()], ['a'])
+        self.assertEqual(store.get('user'), {'name': 'tester', 'account_type': 'vip'})
+        self.assertIsNone(store.get('user', max_age=-1))
+
+        store.update(user=None)
+        self.assertIsNone(store.get('user'))
+        self.assertEqual(store.cookie('a'), '1')
+
+    def test_concurrent_updates_are_atomic(self):
+        errors = []
+
+        def write(store, value):
+            try:
+                for _ in range(50):
+                    store.update(cookies=[cookie(SESSION_COOKIE_NAME, value, self.host)], user={'name': value})
+            except Exception as e:
+                errors.append(e)
+
+        writers = [threading.Thread(target=write, args=(self.store(), str(number))) for number in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+
+        store = self.store()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(store.cookies()), 1)
+        self.assertEqual(store.get('user')['name'], store.cookie(SESSION_COOKIE_NAME))
+
+
+if __name__ == '__main__':
+    unittest.main()
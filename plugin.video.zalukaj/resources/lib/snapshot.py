@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+import time
+
+import xbmcvfs
+from resources.lib.library import exists, vfs_path
+
+""" Name written in snapshot header, to reject other files """
+SNAPSHOT_FORMAT = "zalukaj-catalog"
+
+""" Version of snapshot format, snapshots with newer version can not be imported """
+SNAPSHOT_VERSION = 1
+
+""" Number of listings stored in single transaction during import """
+IMPORT_BATCH = 500
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_name():
+    """
+    :return: string - file name of snapshot created now
+    """
+    return "zalukaj-catalog-{}.jsonl.gz".format(time.strftime("%Y%m%d-%H%M%S"))
+
+
+class CatalogSnapshot(object):
+    """
+    Export and import of cached catalog listings (tv series, seasons, episodes, genres and movies lists).
+
+    Snapshot is gzip compressed file with JSON object in every line. The first line is header with format name and
+    version, every following line is single listing with its kind, url, fetch time and items. Both export and import
+    process one listing at a time, only compressed file is kept in memory. File is read and written through xbmcvfs,
+    so it can be placed in network folder (smb://, nfs://).
+    """
+
+    def __init__(self, cache):
+        """
+        :param cache: CachedZalukaj
+        """
+        self.cache = cache
+
+    def export(self, path):
+        """
+        :param path: string - snapshot file, replaced when export is finished
+        :return: int - number of exported listings
+        """
+        count = 0
+        compressed = io.BytesIO()
+        with gzip.GzipFile(fileobj=compressed, mode='wb') as handle:
+            handle.write(self._line({'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+                                     'created_at': time.time()}))
+            for kind, url, items, fetched_at in self.cache.dump():
+                # Items are already JSON text, they are written without parsing them again
+                handle.write(self._line({'kind': kind, 'url': url, 'fetched_at': fetched_at})[:-2] +
+                             u',"items":{}}}\n'.format(items).encode('utf-8'))
+                count += 1
+
+        temporary_path = path + '.tmp'
+        handle = xbmcvfs.File(vfs_path(temporary_path), 'w')
+        try:
+            written = handle.write(compressed.getvalue())
+        finally:
+            handle.close()
+
+        if not written:
+            raise IOError("Nie można zapisać pliku {}".format(vfs_path(path)))
+        if exists(path):
+            xbmcvfs.delete(vfs_path(path))
+        if not xbmcvfs.rename(vfs_path(temporary_path), vfs_path(path)):
+            raise IOError("Nie można zapisać pliku {}".format(vfs_path(path)))
+        return count
+
+    def load(self, path, batch=IMPORT_BATCH):
+        """
+        Import snapshot into local cache. Listings fetched locally later than ones in snapshot are kept.
+
+        :param path: string - snapshot file
+        :return: dict with:
+            listings: int - number of listings in snapshot
+            stored: int - number of listings stored in cache
+        """
+        stats = {'listings': 0, 'stored': 0}
+        if not exists(path):
+            raise SnapshotError("Nie znaleziono pliku katalogu.")
+
+        source = xbmcvfs.File(vfs_path(path))
+        try:
+            compressed = io.BytesIO(bytes(source.readBytes()))
+        finally:
+            source.close()
+
+        try:
+            with gzip.GzipFile(fileobj=compressed, mode='rb') as handle:
+                self._check_header(handle.readline())
+
+                listings = []
+                for line in handle:
+                    listing = json.loads(line)
+                    listings.append((listing['kind'], listing['url'], json.dumps(listing['items']),
+                                     listing['fetched_at']))
+                    if len(listings) >= batch:
+                        stats['stored'] += self.cache.load(listings)
+                        stats['listings'] += len(listings)
+                        listings = []
+
+                stats['stored'] += self.cache.load(listings)
+                stats['listings'] += len(listings)
+        except (IOError, ValueError, KeyError) as e:
+            raise SnapshotError("Uszkodzony plik katalogu: {}".format(e))
+
+        return stats
+
+    @staticmethod
+    def _check_header(line):
+        try:
+            header = json.loads(line)
+        except ValueError:
+            header = None
+
+        if not isinstance(header, dict) or header.get('format') != SNAPSHOT_FORMAT:
+            raise SnapshotError("Plik nie jest katalogiem zalukaj.")
+
+        if header.get('version', 0) > SNAPSHOT_VERSION:
+            raise SnapshotError("Katalog pochodzi z nowszej wersji dodatku.")
+
+    @staticmethod
+    def _line(data):
+        return (json.dumps(data, separators=(',', ':')) + '\n').encode('utf-8')
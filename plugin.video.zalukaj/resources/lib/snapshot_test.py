@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import os
+import time
+import unittest
+
+from resources.lib import zalukaj
+from resources.lib.cache import CachedZalukaj
+from resources.lib.fixtures import FixtureTestCase, corpus, kodi
+from resources.lib.ids import IdMap
+from resources.lib.storage import Storage
+from resources.lib.zalukaj import Zalukaj
+
+
+class TestCatalogSnapshot(FixtureTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestCatalogSnapshot, cls).setUpClass()
+        kodi.install(cls.data_path)
+        from resources.lib import snapshot
+        cls.snapshot = snapshot
+
+    def setUp(self):
+        super(TestCatalogSnapshot, self).setUp()
+        self.data_path = self.mkdtemp()
+        self.source = self.cache(os.path.join(self.data_path, 'source'))
+        self.target = self.cache(os.path.join(self.data_path, 'target'))
+        self.path = os.path.join(self.data_path, 'catalog.jsonl.gz')
+
+        series = self.source.fetch_tv_series_list()
+        for season in self.source.fetch_tv_series_seasons_list(series[0]['url']):
+            self.source.fetch_tv_series_episodes_list(season['url'])
+        for genre in self.source.fetch_movie_categories_list():
+            self.source.fetch_movies_list(genre['url'])
+
+    def tearDown(self):
+        for cache in [self.source, self.target]:
+            cache.storage.close()
+
+    @staticmethod
+    def cache(data_path):
+        storage = Storage(data_path)
+        return CachedZalukaj(Zalukaj(data_path), storage, IdMap(storage))
+
+    @staticmethod
+    def listings(cache):
+        return sorted((kind, url, json.loads(items), fetched_at) for kind, url, items, fetched_at in cache.dump())
+
+    def test_round_trip(self):
+        count = self.source.storage.fetch_one('SELECT COUNT(*) FROM listings')[0]
+        self.assertEqual(self.snapshot.CatalogSnapshot(self.source).export(self.path), count)
+
+        del self.server.requests[:]
+        self.assertEqual(self.snapshot.CatalogSnapshot(self.target).load(self.path, batch=3), {'listings': count, 'stored': count})
+        self.assertEqual(self.listings(self.target), self.listings(self.source))
+
+        series = self.target.fetch_tv_series_list()
+        self.assertEqual(len(series), len(corpus.SERIES_NAMES))
+        self.assertEqual(series[0]['title'], self.source.fetch_tv_series_list()[0]['title'])
+        self.assertEqual(self.server.requests, [])
+
+    def test_newer_local_listings_are_kept(self):
+        self.snapshot.CatalogSnapshot(self.source).export(self.path)
+        home = self.target.put('tv_series', zalukaj.URL, [{'url': '/local', 'title': u'Lokalna'}],
+                               fetched_at=time.time() + 60)
+
+        stats = self.snapshot.CatalogSnapshot(self.target).load(self.path)
+        self.assertEqual(stats['stored'], stats['listings'] - 1)
+        self.assertEqual(self.target.get('tv_series', zalukaj.URL), home)
+
+    def test_invalid_snapshot(self):
+        with gzip.open(self.path, 'wb') as handle:
+            handle.write(b'{"format":"zalukaj-catalog","version":%d}\n' % (self.snapshot.SNAPSHOT_VERSION + 1))
+        self.assertRaises(self.snapshot.SnapshotError, self.snapshot.CatalogSnapshot(self.target).load, self.path)
+
+        with open(self.path, 'wb') as handle:
+            handle.write(b'not gzip')
+        self.assertRaises(self.snapshot.SnapshotError, self.snapshot.CatalogSnapshot(self.target).load, self.path)
+
+        os.remove(self.path)
+        self.assertRaises(self.snapshot.SnapshotError, self.snapshot.CatalogSnapshot(self.target).load, self.path)
+
+    def test_unicode_path(self):
+        folder = os.path.join(self.data_path, u'Kopie świąteczne')
+        os.mkdir(folder.encode('utf-8'))
+        path = os.path.join(folder, u'katalog.jsonl.gz')
+
+        count = self.snapshot.CatalogSnapshot(self.source).export(path)
+        self.assertEqual(self.snapshot.CatalogSnapshot(self.target).load(path)['listings'], count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+""" Database file in add-on profile directory """
+FILE_DATABASE_NAME = "zalukaj.db"
+
+""" Maximum wait time for database locked by another process """
+DATABASE_TIMEOUT = 10
+
+
+class Storage(object):
+    """
+    Local SQLite database shared by add-on components.
+    Every component creates its own tables using `schema`, connection may be used from many threads.
+    Database is in WAL mode, so plugin and service processes can read while one of them writes.
+    """
+
+    def __init__(self, data_path):
+        if data_path and not os.path.isdir(data_path):
+            os.makedirs(data_path)
+
+        self.path = os.path.join(data_path, FILE_DATABASE_NAME)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(self.path, timeout=DATABASE_TIMEOUT, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+
+    def schema(self, *statements):
+        """
+        Execute create statements, they have to use IF NOT EXISTS clause.
+        """
+        with self.transaction() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def fetch_one(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchone()
+
+    def fetch_all(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def execute(self, query, parameters=()):
+        with self.transaction() as cursor:
+            cursor.execute(query, parameters)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run statements in single transaction, committed when block ends without exception.
+
+        :return: sqlite3.Cursor
+        """
+        with self._lock:
+            with self._connection:
+                yield self._connection.cursor()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
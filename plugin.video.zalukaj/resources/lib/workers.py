@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from Queue import Queue
+
+""" Default number of worker threads in pool """
+DEFAULT_WORKERS = 16
+
+""" Default number of requests allowed to be send at the same time """
+DEFAULT_CONCURRENCY = 8
+
+""" Default number of requests started per second, None means no limit """
+DEFAULT_RATE = None
+
+
+class Future(object):
+    """
+    Result of call scheduled in WorkerPool.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def set_result(self, result):
+        self._result = result
+        self._done.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def exception(self, timeout=None):
+        self._wait(timeout)
+        return self._exception
+
+    def result(self, timeout=None):
+        """
+        Wait for call to finish and return its result.
+        Exception raised by call is raised again in caller thread.
+
+        :param timeout: float | None - maximum wait time in seconds
+        :return: value returned by scheduled call
+        """
+        self._wait(timeout)
+        if self._exception is not None:
+            raise self._exception
+
+        return self._result
+
+    def _wait(self, timeout):
+        self._done.wait(timeout)
+        if not self._done.is_set():
+            raise RuntimeError("Call did not finish in {} seconds.".format(timeout))
+
+
+class WorkerPool(object):
+    """
+    Fixed size pool of daemon threads executing scheduled calls in order of submission.
+    Threads are started on first submit, so unused pool costs nothing.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._queue = Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule call in pool.
+
+        :return: Future
+        """
+        self._start()
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def map(self, fn, iterable):
+        """
+        Call fn for every element concurrently and wait for all results.
+
+        :return: list - results in order of iterable
+        """
+        return gather([self.submit(fn, item) for item in iterable])
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+        for _ in threads:
+            self._queue.put(None)
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name='zalukaj-worker-{}'.format(len(self._threads)))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+
+            future, fn, args, kwargs = task
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+
+class RateLimiter(object):
+    """
+    Limit number of requests send at the same time and number of requests started per second.
+    One limiter is shared by all threads using the same client, so bulk operations can not
+    trigger overload protection of the service.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
+        self.concurrency = concurrency
+        self.rate = rate
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._interval = 1.0 / rate if rate else 0
+        self._next_start = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True):
+        """
+        Take request slot, waiting for free one and for next allowed start time.
+
+        :param blocking: bool - when False return immediately if request can not be started now
+        :return: bool - True if slot was taken
+        """
+        if not self._slots.acquire(blocking):
+            return False
+
+        with self._lock:
+            now = time.time()
+            delay = self._next_start - now
+            if delay > 0 and not blocking:
+                self._slots.release()
+                return False
+
+            self._next_start = max(now, self._next_start) + self._interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return True
+
+    def release(self):
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class SingleFlight(object):
+    """
+    Calls with the same key made while the first one is still running do not run again,
+    they wait for the first call and share its result or exception.
+    """
+
+    def __init__(self):
+        self.calls = 0  # number of executed calls
+        self.coalesced = 0  # number of calls which shared result of running call
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        :param key: hashable - calls with equal keys are coalesced
+        :return: value returned by fn
+        """
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return_shared = True
+            else:
+                future = self._running[key] = Future()
+                self.calls += 1
+                return_shared = False
+
+        if return_shared:
+            return future.result()
+
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._running[key]
+
+        return future.result()
+
+    def running(self, key):
+        """
+        Join running call without starting new one.
+
+        :return: Future | None - future of running call with given key
+        """
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None:
+                self.coalesced += 1
+
+            return future
+
+
+def gather(futures):
+    """
+    Wait for all futures and return their results.
+
+    :param futures: list of Future
+    :return: list - results in order of futures
+    """
+    return [future.result() for future in futures]
@@ -1,10 +1,19 @@
 # -*- coding: utf-8 -*-
 import os
 import re
-from cookielib import LWPCookieJar
+import threading
+import time
+from HTMLParser import HTMLParser
+from Queue import Queue, Empty
+from urlparse import parse_qs, urlparse, urlunparse
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from resources.lib.latency import LatencyTracker, endpoint
+from resources.lib.session_store import SessionStore, StoredCookieJar
+from resources.lib.storage import Storage
+from resources.lib.workers import RateLimiter, SingleFlight
 
 """ Main url address """
 URL = "https://zalukaj.com"
@@ -12,13 +21,42 @@ URL = "https://zalukaj.com"
 """ Cookie name where session is stored """
 SESSION_COOKIE_NAME = "PHPSESSID"
 
-""" Maximum wait time for response"""
-REQUEST_TIMEOUT = 5
+""" Number of hosts with kept alive connections (service, covers and stream hosts) """
+POOL_CONNECTIONS = 4
 
-""" File where cookies are storage """
+""" Size of response chunks passed to streaming parsers """
+STREAM_CHUNK_SIZE = 8 * 1024
+
+""" File where cookies were stored by previous versions, migrated to session store """
 FILE_COOKIES_NAME = "zalukaj.cookie"
 
 
+def canonical_url(link):
+    """
+    Make absolute url used as the only key of page, no matter how link to it was written.
+
+    :param link: string - absolute, protocol relative or relative link
+    :return: string - absolute url with lowercase scheme and host, without default port and fragment
+    """
+    if link[0:2] == '//':
+        link = "https:{}".format(link)
+
+    if not urlparse(link).netloc:
+        link = "{}{}".format(URL, link if link[0:1] == '/' else '/' + link)
+
+    parts = urlparse(link)
+    scheme = parts.scheme.lower()
+    host = parts.netloc.lower()
+    if (scheme, host.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        host = host.rsplit(':', 1)[0]
+
+    # Links to service written with other scheme than main url
+    if host == urlparse(URL).netloc:
+        scheme = urlparse(URL).scheme
+
+    return urlunparse((scheme, host, parts.path or '/', parts.params, parts.query, ''))
+
+
 class ZalukajError(Exception):
     pass
 
@@ -31,6 +69,10 @@ class ZalukajLoginError(ZalukajError):
     pass
 
 
+class ZalukajConnectionError(ZalukajError):
+    pass
+
+
 class ZalukajUser(object):
     def __init__(self, name=None, account_type=None):
         self.name = name
@@ -42,27 +84,89 @@ class ZalukajUser(object):
     def is_premium(self):
         return self.is_logged() and 'vip' in self.account_type.lower()
 
+    def state(self):
+        """
+        :return: dict | None - user kept in session store, None when user is not logged
+        """
+        return {'name': self.name, 'account_type': self.account_type} if self.is_logged() else None
+
     def __repr__(self):
         return 'ZalukajUser<{}, {}>'.format(self.name.encode('utf-8'), self.account_type.encode('utf-8'))
 
 
+class TvSeriesMenuParser(HTMLParser):
+    """
+    Incremental parser of tv series menu from home page (anchors from `div#two table#main_menu`).
+
+    Feed it with chunks of page, after every chunk parsed tv series are available in `items`.
+    When menu table is closed `finished` is set and rest of page can be skipped.
+    """
+
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.items = []
+        self.finished = False
+        self._div_depth = 0  # number of open divs inside div#two
+        self._table_depth = 0  # number of open tables inside table#main_menu
+        self._anchor = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.finished:
+            return
+
+        attrs = dict(attrs)
+        if tag == 'div' and (self._div_depth or attrs.get('id') == 'two'):
+            self._div_depth += 1
+        elif tag == 'table' and self._div_depth and (self._table_depth or attrs.get('id') == 'main_menu'):
+            self._table_depth += 1
+        elif tag == 'a' and self._table_depth and 'href' in attrs:
+            self._anchor = {'url': attrs['href'], 'title': attrs.get('title', '')}
+
+    def handle_endtag(self, tag):
+        if self.finished:
+            return
+
+        if tag == 'a' and self._anchor:
+            self.items.append(self._anchor)
+            self._anchor = None
+        elif tag == 'table' and self._table_depth:
+            self._table_depth -= 1
+            self.finished = self._table_depth == 0
+        elif tag == 'div' and self._div_depth:
+            self._div_depth -= 1
+
+    def pop_items(self):
+        items, self.items = self.items, []
+        return items
+
+
 class Zalukaj(object):
     headers = {
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
         'Accept-Language': 'pl,en-US;q=0.9,en;q=0.8,fr;q=0.7',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
         'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/66.0.3359.181 Safari/537.36',
         'Referer': 'https://zalukaj.com/',
         'Origin': 'https://zalukaj.com/'
     }
 
-    def __init__(self, data_path, session=None):
-        cookies_file = os.path.join(data_path, FILE_COOKIES_NAME)  # Define path to cookies file
+    def __init__(self, data_path, session=None, limiter=None, latency=None, store=None):
+        self.store = store if store else SessionStore(Storage(data_path))
+        self.store.migrate(os.path.join(data_path, FILE_COOKIES_NAME))
         self.session = session if session else requests.Session()
-        self.session.cookies = LWPCookieJar(cookies_file)
-
-        # Load cookies if file exists
-        if os.path.isfile(cookies_file):
-            self.session.cookies.load()
+        self.limiter = limiter if limiter else RateLimiter()
+        self.latency = latency if latency else LatencyTracker()
+        self.flights = SingleFlight()
+        self.requests = 0
+        self.hedged = 0
+        self._requests_lock = threading.Lock()
+        self.session.cookies = StoredCookieJar(self.store)
+
+        # Every request slot of limiter can keep its connection alive
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=self.limiter.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def login(self, user, password):
         """
@@ -76,29 +180,31 @@ class Zalukaj(object):
 
         """
         Session is initialized if expected session cookie is present in request response.
+        Cookies and logged user are stored together, so other processes never see one without the other.
         """
 
         def initialize_session(response_cookies):
             if response_cookies.get(SESSION_COOKIE_NAME) is not None:
-                self.session.cookies.save()
-                return self.fetch_user_data()
+                user = self.fetch_user_data()
+                self.session.cookies.save(user=user.state())
+                return user
 
             return ZalukajUser()
 
-        headers = self.headers
+        headers = dict(self.headers)
         """
         First we have to fetch csrf hash token to perform login action.
         To do this fetch main page raw html and take hash from form.
         """
-        main_page_response = self.session.get(url=URL,
-                                              headers=headers,
-                                              allow_redirects=False,
-                                              timeout=REQUEST_TIMEOUT)
+        main_page_response = self._request('get',
+                                           url=URL,
+                                           headers=headers,
+                                           allow_redirects=False)
 
         """
         If hash is present, take it from known input.
-        If hash is not present we are probably logged in or account is blocked. Check known problems before fetching 
-        hash content.
+        If hash is not present we are probably logged in or account is blocked. Known problems are detected before.
+        Redirects are not followed, so page of another address (e.g. account blocked notice) is not taken for main page.
         """
         self._detect_problems(main_page_response)
         login_hash_obj = self._get_bs4(main_page_response.text).find('input', attrs={'name': 'hash'})
@@ -109,11 +215,11 @@ class Zalukaj(object):
         """
         headers['Content-Type'] = 'application/x-www-form-urlencoded'
         headers['X-Requested-With'] = 'XMLHttpRequest'
-        login_response = self.session.post(url='{}/ajax/login'.format(URL),
-                                           data='username={}&password={}&hash={}'.format(user, password, login_hash),
-                                           headers=headers,
-                                           allow_redirects=False,
-                                           timeout=REQUEST_TIMEOUT)
+        login_response = self._request('post',
+                                       url='{}/ajax/login'.format(URL),
+                                       data='username={}&password={}&hash={}'.format(user, password, login_hash),
+                                       headers=headers,
+                                       allow_redirects=False)
 
         if "Zalogowano!" not in login_response.text:
             raise ZalukajLoginError("Wystąpił problem z logowaniem.")
@@ -122,10 +228,19 @@ class Zalukaj(object):
 
     def logout(self):
         """
-        To logout just remove all cookies.
+        To logout just remove all cookies and stored user.
         """
         self.session.cookies.clear()
-        self.session.cookies.save()
+        self.session.cookies.save(user=None)
+
+    def stored_user(self):
+        """
+        User stored when account page was checked last time, by this or another process.
+
+        :return: ZalukajUser - user object, not logged when no user is stored
+        """
+        state = self.store.get('user')
+        return ZalukajUser(**state) if state else ZalukajUser()
 
     def fetch_user_data(self):
         """
@@ -163,10 +278,11 @@ class Zalukaj(object):
 
         soup = self._get('{}/libs/ajax/login.php?login=1&x=2043'.format(URL))
         username = get_user_name(soup)
-        if username:  # if username is present, user is logged in
-            return ZalukajUser(name=username, account_type=get_account_type(soup))
+        user = ZalukajUser(name=username, account_type=get_account_type(soup)) if username else ZalukajUser()
 
-        return ZalukajUser()
+        # Stored user is removed when session expired in service
+        self.store.update(user=user.state())
+        return user
 
     def fetch_tv_series_list(self):
         """
@@ -177,9 +293,46 @@ class Zalukaj(object):
             title: string - tv series name
         """
 
-        soup = self._get(URL)
-        collection = soup.select('div#two table#main_menu a')
-        return [{'url': single['href'], 'title': single['title']} for single in collection]
+        # Home page fetched at the same time for other list or login is shared instead of streaming it again
+        home_page = self.flights.running(canonical_url(URL))
+        if home_page is not None:
+            return [{'url': single['href'], 'title': single.get('title', '')}
+                    for single in home_page.result().select('div#two table#main_menu a[href]')]
+
+        return self.flights.do(('tv_series', canonical_url(URL)), lambda: list(self.iter_tv_series_list()))
+
+    def iter_tv_series_list(self):
+        """
+        Stream list of all available tv shows.
+
+        Home page is huge, so it is not buffered and parsed as a whole. Every tv series is yielded as soon as
+        its anchor is received and download stops right after end of tv series menu.
+
+        :return: generator of dicts, the same as in fetch_tv_series_list
+        """
+
+        parser = TvSeriesMenuParser()
+        response = self._request('get',
+                                 url=URL,
+                                 headers=self.headers,
+                                 allow_redirects=True,
+                                 stream=True)
+        try:
+            self._detect_problems(response)
+            response.encoding = response.encoding or 'utf-8'
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE, decode_unicode=True):
+                parser.feed(chunk)
+                for item in parser.pop_items():
+                    yield item
+
+                if parser.finished:
+                    break
+
+            parser.close()
+            for item in parser.pop_items():
+                yield item
+        finally:
+            response.close()
 
     def fetch_tv_series_seasons_list(self, link):
         """
@@ -206,10 +359,7 @@ class Zalukaj(object):
             except:
                 return text
 
-        if link[0:5] != "https":
-            link = "{}{}".format(URL, link)
-
-        soup = self._get(link)
+        soup = self._get(canonical_url(link))
 
         # Fetch image
         image = soup.select_one('div.blok2 div > img')
@@ -244,7 +394,7 @@ class Zalukaj(object):
 
             return None, None
 
-        soup = self._get("{}{}".format(URL, link))
+        soup = self._get(canonical_url(link))
 
         # Fetch image
         image = soup.select_one('div.blok2 div > img')
@@ -275,32 +425,44 @@ class Zalukaj(object):
             url: string - address to stream for specified quality
         """
 
-        soup = self._get(link)
+        soup = self._get(canonical_url(link))
 
-        return self.fetch_movie_from_player("{}{}&x=1".format(URL, soup.select_one('iframe')['src']))
+        return self.fetch_movie_from_player(canonical_url("{}&x=1".format(soup.select_one('iframe')['src'])))
 
     def fetch_movie_from_player(self, link):
+        """
+        Fetch streams of movie from player page.
+
+        :param link: string - player page
+        :return: dict | None - None when streams are not available for user, otherwise:
+            streams: list of dicts with quality and url
+            versions: list of dicts with version name and url of its player page
+            version: string | None - name of version shown by this page, None when page is not linked by any version
+        """
+
         def is_premium(ms):
             return len(ms.select('source')) > 0
 
-        # Add domain URL hen not present
-        if "//zalukaj.com" not in link:
-            link = "{}{}".format(URL, link)
-
-        if link[0:2] == '//':
-            link = "https:{}".format(link)
+        def player_key(url):
+            # Version is selected by path and query, `x` parameter only marks player opened from movie page
+            parts = urlparse(canonical_url(url))
+            query = parse_qs(parts.query)
+            query.pop('x', None)
+            return parts.path, sorted(query.items())
 
-        movie_soup = self._get(link)
+        movie_soup = self._get(canonical_url(link))
 
         # First try parse page as not logged in
         if is_premium(movie_soup):
             versions = [{'version': source.string, 'url': source['href']} for source in
                         movie_soup.select('div#buttonsPL a')]
             streams = [{'quality': source['label'], 'url': source['src']} for source in movie_soup.select('source')]
+            current = [version['version'] for version in versions if player_key(version['url']) == player_key(link)]
 
             return {
                 'streams': streams,
-                'versions': versions
+                'versions': versions,
+                'version': current[0] if current else None
             }
 
         return None
@@ -327,6 +489,7 @@ class Zalukaj(object):
             title: string - tv series name
             img: string - movie thumb,
             description: string - movie short description
+            nav: bool - present only in navigation items, together with page: int - linked page number
         """
 
         def get_navigation_links(navigation):
@@ -342,14 +505,14 @@ class Zalukaj(object):
                         if current_page - 1 == item_page:
                             previous_page = [
                                 item_page,
-                                item['href'] if item['href'][0:5] == 'https' else '{}{}'.format(URL, item['href'])
+                                canonical_url(item['href'])
                             ]
                             continue
 
                         if current_page + 1 == item_page:
                             next_page = [
                                 item_page,
-                                item['href'] if item['href'][0:5] == 'https' else '{}{}'.format(URL, item['href'])
+                                canonical_url(item['href'])
                             ]
                             continue
                     except:
@@ -365,7 +528,7 @@ class Zalukaj(object):
             if cover_item and cover_item['style']:
                 reg = re.search('background-image:url\(([a-z0-9-_.:/)]+)\);', cover_item['style'], re.IGNORECASE)
                 if reg and len(reg.groups()) == 1:
-                    return reg.group(1) if reg.group(1)[0:5] == 'https' else '{}{}'.format(URL, reg.group(1))
+                    return canonical_url(reg.group(1))
 
             return None
 
@@ -383,10 +546,7 @@ class Zalukaj(object):
 
             return None
 
-        if link[0:5] != 'https':
-            link = "{}{}".format(URL, link)
-
-        soup = self._get(link)
+        soup = self._get(canonical_url(link))
         link_next, link_previous = get_navigation_links(soup.select_one("div.categories_page"))
 
         # Fetch movies
@@ -394,10 +554,12 @@ class Zalukaj(object):
         if link_next:
             movies.append({'url': link_next[1],
                            'title': '<< Wróć (strong {}) <<'.format(link_next[0]),
+                           'page': link_next[0],
                            'nav': True})
         if link_previous:
             movies.append({'url': link_previous[1],
                            'title': '>> Dalej (strona {}) >>'.format(link_previous[0]),
+                           'page': link_previous[0],
                            'nav': True})
 
         for item in soup.select('div#index_content div.tivief4'):
@@ -414,10 +576,12 @@ class Zalukaj(object):
         if link_next:
             movies.append({'url': link_next[1],
                            'title': '<< Wróć (strong {}) <<'.format(link_next[0]),
+                           'page': link_next[0],
                            'nav': True})
         if link_previous:
             movies.append({'url': link_previous[1],
                            'title': '>> Dalej (strona {}) >>'.format(link_previous[0]),
+                           'page': link_previous[0],
                            'nav': True})
 
         return movies
@@ -445,7 +609,7 @@ class Zalukaj(object):
             if data:
                 is_tv_series = re.search('.*/serial.*', data['href'])
                 movies.append({
-                    'url': data['href'] if data['href'][0:5] == 'https' else '{}{}'.format(URL, data['href']),
+                    'url': canonical_url(data['href']),
                     'img': cover['src'] if cover else None,
                     'year': get_movie_year(item.select_one('div.details div.gen')),
                     'title': data['title'].encode('utf-8'),
@@ -457,16 +621,101 @@ class Zalukaj(object):
 
     def _get(self, url):
         """
+        Fetch and parse page. Callers asking for the same page at the same time share one request and parsed page,
+        so returned object must not be modified.
+
         :param url: string - url address to fetch and parse
         :return: BeautifulSoup
         """
-        response = self.session.get(url=url,
-                                    headers=self.headers,
-                                    allow_redirects=True,
-                                    timeout=REQUEST_TIMEOUT)
+        return self.flights.do(canonical_url(url), self._fetch_page, canonical_url(url))
+
+    @property
+    def stats(self):
+        """
+        :return: dict with:
+            requests: int - number of requests sent
+            coalesced: int - number of page fetches which shared request already sent for the same page
+            hedged: int - number of duplicate requests sent because first one was slower than usual
+        """
+        return {'requests': self.requests, 'coalesced': self.flights.coalesced, 'hedged': self.hedged}
+
+    def _fetch_page(self, url):
+        response = self._request('get',
+                                 url=url,
+                                 headers=self.headers,
+                                 allow_redirects=True,
+                                 hedge=True)
         self._detect_problems(response)
         return self._get_bs4(response.text)
 
+    def _request(self, method, hedge=False, **kwargs):
+        """
+        Send request using client session. Every request waits for free slot in rate limiter.
+        Timeout depends on measured latency of requested endpoint.
+
+        :param method: string - http method name
+        :param hedge: bool - send duplicate of idempotent request when response is slower than p95 of endpoint,
+            the first response is returned
+        :return: requests.Response
+        """
+        delay = self.latency.hedge_delay(endpoint(kwargs['url'])) if hedge else None
+        if delay is None:
+            with self.limiter:
+                return self._send(method, **kwargs)
+
+        answers = Queue()
+
+        def attempt():
+            try:
+                answers.put((self._send(method, **kwargs), None))
+            except Exception as e:
+                answers.put((None, e))
+            finally:
+                self.limiter.release()
+
+        def start():
+            thread = threading.Thread(target=attempt, name='zalukaj-request')
+            thread.daemon = True
+            thread.start()
+
+        self.limiter.acquire()
+        start()
+        attempts = 1
+        try:
+            response, error = answers.get(timeout=delay)
+        except Empty:
+            # Duplicate is sent only when limiter has free slot right now, hedging must not overload service
+            if self.limiter.acquire(blocking=False):
+                with self._requests_lock:
+                    self.hedged += 1
+                start()
+                attempts += 1
+            response, error = answers.get()
+            if error is not None and attempts > 1:
+                response, error = answers.get()
+
+        if error is not None:
+            raise error
+
+        return response
+
+    def _send(self, method, **kwargs):
+        name = endpoint(kwargs['url'])
+        timeout = self.latency.timeout(name)
+        with self._requests_lock:
+            self.requests += 1
+
+        # Timed out requests are not recorded, their latency is unknown and would only lengthen next timeouts
+        start = time.time()
+        try:
+            response = self.session.request(method, timeout=timeout, **kwargs)
+        except requests.Timeout:
+            raise ZalukajConnectionError("Serwis nie odpowiedział w ciągu {:g} s. Spróbuj ponownie.".format(timeout))
+        except requests.RequestException:
+            raise ZalukajConnectionError("Brak połączenia z serwisem. Spróbuj ponownie.")
+        self.latency.record(name, time.time() - start)
+        return response
+
     @staticmethod
     def _get_bs4(text):
         """
@@ -483,8 +732,8 @@ class Zalukaj(object):
 
         :param response: requests.Response
         """
-        soup = BeautifulSoup(response.text, 'html.parser')
         if response.status_code == 503:
+            soup = BeautifulSoup(response.text, 'html.parser')
             if "Duze obciazenie!" in soup.text:
                 raise ZalukajSuspiciousActivityError("Duże obciążenie serwisu. Spróbuj się zalogować.")
 
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from resources.lib.workers import WorkerPool, DEFAULT_WORKERS, gather
+
+
+class AsyncZalukaj(object):
+    """
+    Concurrent counterpart of Zalukaj client.
+
+    Every method has the same name and arguments as in Zalukaj but returns Future instead of result.
+    Calls are executed in worker pool by wrapped client, so parsing code, cookie session and rate limiter
+    are shared with synchronous calls. Kodi runs add-ons on Python 2, so worker threads are used
+    instead of asyncio.
+    """
+
+    def __init__(self, client, workers=DEFAULT_WORKERS, pool=None):
+        """
+        :param client: Zalukaj - client used to send requests and parse responses
+        :param workers: int - number of calls executed at the same time
+        :param pool: WorkerPool - pool shared with other components, created when not given
+        """
+        self.client = client
+        self.pool = pool if pool else WorkerPool(workers)
+
+    def fetch_tv_series_list(self):
+        return self.pool.submit(self.client.fetch_tv_series_list)
+
+    def fetch_tv_series_seasons_list(self, link):
+        return self.pool.submit(self.client.fetch_tv_series_seasons_list, link)
+
+    def fetch_tv_series_episodes_list(self, link):
+        return self.pool.submit(self.client.fetch_tv_series_episodes_list, link)
+
+    def fetch_movie_categories_list(self):
+        return self.pool.submit(self.client.fetch_movie_categories_list)
+
+    def fetch_movies_list(self, link):
+        return self.pool.submit(self.client.fetch_movies_list, link)
+
+    def search_movies(self, search_phrase):
+        return self.pool.submit(self.client.search_movies, search_phrase)
+
+    def fetch_movie_details(self, link):
+        return self.pool.submit(self.client.fetch_movie_details, link)
+
+    def fetch_movie_from_player(self, link):
+        return self.pool.submit(self.client.fetch_movie_from_player, link)
+
+    def fetch_many(self, method, links):
+        """
+        Call given method for every link concurrently and wait for all results.
+
+        :param method: string - name of fetch method, ex. 'fetch_tv_series_episodes_list'
+        :param links: list of strings - links passed to method
+        :return: list - results in order of links
+        """
+        return gather([getattr(self, method)(link) for link in links])
+
+    def close(self):
+        self.pool.shutdown()
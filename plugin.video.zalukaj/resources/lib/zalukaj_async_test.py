@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+
+from resources.lib.fixtures import FixtureTestCase
+from resources.lib.workers import RateLimiter, WorkerPool
+from resources.lib.zalukaj import Zalukaj, ZalukajSuspiciousActivityError
+from resources.lib.zalukaj_async import AsyncZalukaj
+
+
+class TestAsyncZalukaj(FixtureTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestAsyncZalukaj, cls).setUpClass()
+        cls.z = Zalukaj(cls.data_path)
+        cls.az = AsyncZalukaj(Zalukaj(cls.data_path, limiter=RateLimiter(concurrency=32)), workers=32)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.az.close()
+        super(TestAsyncZalukaj, cls).tearDownClass()
+
+    def test_results_are_identical(self):
+        series = self.z.fetch_tv_series_list()
+        self.assertEqual(self.az.fetch_tv_series_list().result(), series)
+
+        seasons = self.z.fetch_tv_series_seasons_list(series[0]['url'])
+        self.assertEqual(self.az.fetch_tv_series_seasons_list(series[0]['url']).result(), seasons)
+
+        episodes = self.z.fetch_tv_series_episodes_list(seasons[0]['url'])
+        self.assertEqual(self.az.fetch_tv_series_episodes_list(seasons[0]['url']).result(), episodes)
+
+        categories = self.z.fetch_movie_categories_list()
+        self.assertEqual(self.az.fetch_movie_categories_list().result(), categories)
+
+        movies = self.z.fetch_movies_list(categories[0]['url'])
+        self.assertEqual(self.az.fetch_movies_list(categories[0]['url']).result(), movies)
+
+        self.assertEqual(self.az.search_movies('futurama').result(), self.z.search_movies('futurama'))
+        self.assertEqual(self.az.fetch_movie_details(movies[0]['url']).result(),
+                         self.z.fetch_movie_details(movies[0]['url']))
+
+    def test_crawl_is_identical(self):
+        links = [item['url'] for item in self.z.fetch_tv_series_list()]
+        seasons = [self.z.fetch_tv_series_seasons_list(link) for link in links]
+        self.assertEqual(self.az.fetch_many('fetch_tv_series_seasons_list', links), seasons)
+
+        links = [season['url'] for items in seasons for season in items]
+        episodes = [self.z.fetch_tv_series_episodes_list(link) for link in links]
+        self.assertEqual(self.az.fetch_many('fetch_tv_series_episodes_list', links), episodes)
+
+    def test_errors_are_raised_in_caller(self):
+        self.server.overloaded = True
+        future = self.az.fetch_tv_series_list()
+        self.assertRaises(ZalukajSuspiciousActivityError, future.result)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_concurrency_is_limited(self):
+        limiter = RateLimiter(concurrency=3)
+        pool = WorkerPool(workers=12)
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def work(_):
+            with limiter:
+                with lock:
+                    state['running'] += 1
+                    state['peak'] = max(state['peak'], state['running'])
+                time.sleep(0.01)
+                with lock:
+                    state['running'] -= 1
+
+        pool.map(work, range(30))
+        pool.shutdown()
+        self.assertEqual(state['peak'], 3)
+
+    def test_rate_is_limited(self):
+        limiter = RateLimiter(concurrency=10, rate=100)
+        start = time.time()
+        for _ in range(11):
+            with limiter:
+                pass
+
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        self.assertTrue(limiter.acquire(blocking=False) is False)
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from resources.lib.fixtures import FixtureTestCase, corpus
+from resources.lib.workers import RateLimiter
+from resources.lib.zalukaj import Zalukaj, ZalukajSuspiciousActivityError
+
+
+class TestRequestCoalescing(FixtureTestCase):
+
+    server_latency = 0.2
+
+    def setUp(self):
+        super(TestRequestCoalescing, self).setUp()
+        self.client = Zalukaj(self.mkdtemp(), limiter=RateLimiter(concurrency=12))
+
+    def run_concurrently(self, *calls):
+        """
+        :return: list of results or raised exceptions, in order of calls
+        """
+        results = [None] * len(calls)
+
+        def run(index, call):
+            try:
+                results[index] = call()
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def wait_for_request(self, path):
+        while path not in self.server.requests:
+            time.sleep(0.005)
+
+    def test_same_page_is_fetched_once(self):
+        link = corpus.series_url(*corpus.series()[0][0:2])
+        results = self.run_concurrently(*[lambda: self.client.fetch_tv_series_seasons_list(link)] * 5)
+
+        self.assertEqual(self.server.requests, [link])
+        self.assertEqual(results, [results[0]] * 5)
+        self.assertEqual(self.client.stats, {'requests': 1, 'coalesced': 4, 'hedged': 0})
+
+    def test_home_page_is_shared(self):
+        categories = []
+        thread = threading.Thread(target=lambda: categories.extend(self.client.fetch_movie_categories_list()))
+        thread.start()
+        self.wait_for_request('/')
+
+        series, user = self.run_concurrently(self.client.fetch_tv_series_list,
+                                             lambda: self.client.login(corpus.USER_NAME, 'secret'))
+        thread.join()
+
+        # login reads home page without following redirects, so it is not shared with listings
+        self.assertEqual(self.server.requests.count('/'), 2)
+        self.assertEqual(len(categories), len(corpus.GENRES))
+        self.assertEqual(series, list(self.client.iter_tv_series_list()))
+        self.assertTrue(user.is_logged())
+        self.assertEqual(self.client.stats['coalesced'], 1)
+
+    def test_error_is_shared(self):
+        self.server.overloaded = True
+        results = self.run_concurrently(*[self.client.fetch_movie_categories_list] * 3)
+
+        self.assertEqual(self.server.requests, ['/'])
+        for result in results:
+            self.assertIsInstance(result, ZalukajSuspiciousActivityError)
+
+    def test_later_calls_are_not_coalesced(self):
+        self.client.fetch_movie_categories_list()
+        self.client.fetch_movie_categories_list()
+        self.assertEqual(self.server.requests, ['/', '/'])
+
+    def test_connection_pool_fits_limiter(self):
+        adapter = self.client.session.get_adapter(self.server.url)
+        self.assertEqual(adapter._pool_maxsize, 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import mock
+import requests
+from resources.lib.fixtures import FixtureTestCase
+from resources.lib.zalukaj import Zalukaj, TvSeriesMenuParser, ZalukajSuspiciousActivityError
+
+
+class TestTvSeriesStreaming(FixtureTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestTvSeriesStreaming, cls).setUpClass()
+        cls.z = Zalukaj(cls.data_path)
+
+    def test_same_result_as_full_parse(self):
+        soup = self.z._get(self.server.url)
+        expected = [{'url': item['href'], 'title': item['title']} for item in soup.select('div#two table#main_menu a')]
+
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(self.z.fetch_tv_series_list(), expected)
+
+    def test_parser_handles_any_chunk_boundaries(self):
+        html = (u'<div id="one"><table id="main_menu"><a href="/x">x</a></table></div>'
+                u'<div id="two"><div><table id="main_menu"><tr><td>'
+                u'<a href="/serial/a-1.html" title="B&amp;B">B&amp;B</a></td></tr>'
+                u'<tr><td><table><tr><td><a href="/serial/b-2.html" title="Żywioł">'
+                u'</a></td></tr></table></td></tr></table></div></div>'
+                u'<div id="two"><table id="main_menu"><a href="/serial/c-3.html" title="c"></a></table></div>')
+        expected = [{'url': '/serial/a-1.html', 'title': u'B&B'}, {'url': '/serial/b-2.html', 'title': u'Żywioł'}]
+
+        for size in (1, 7, len(html)):
+            parser = TvSeriesMenuParser()
+            for start in range(0, len(html), size):
+                parser.feed(html[start:start + size])
+            self.assertEqual(parser.items, expected)
+            self.assertTrue(parser.finished)
+
+    def test_download_stops_after_menu(self):
+        self.server.home_padding = 50000
+        chunks = []
+        iter_content = requests.Response.iter_content
+
+        def counting_iter_content(response, *args, **kwargs):
+            for chunk in iter_content(response, *args, **kwargs):
+                chunks.append(chunk)
+                yield chunk
+
+        with mock.patch.object(requests.Response, 'iter_content', counting_iter_content):
+            items = self.z.fetch_tv_series_list()
+
+        received = sum(len(chunk) for chunk in chunks)
+        self.assertGreater(len(items), 0)
+        self.assertLess(received, len(self.z.session.get(self.server.url).text) / 10)
+
+    def test_overload_is_detected(self):
+        self.server.overloaded = True
+        self.assertRaises(ZalukajSuspiciousActivityError, self.z.fetch_tv_series_list)
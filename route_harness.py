@@ -0,0 +1,154 @@
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+ADDON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugin.video.zalukaj")
+sys.path.insert(0, ADDON_PATH)
+
+from resources.lib import zalukaj  # noqa: E402
+from resources.lib.fixtures import FixtureServer, corpus, kodi  # noqa: E402
+
+SETTINGS = {
+    'zalukaj_login': 'true',
+    'zalukaj_username': 'tester',
+    'zalukaj_password': 'secret',
+    'video.quality': '0',
+    'video.version': '0',
+    'video.probe': 'true',
+    'debug': 'false',
+}
+
+
+def addon_version():
+    with open(os.path.join(ADDON_PATH, "addon.xml")) as handle:
+        return re.search('<addon[^>]* version="([^"]+)"', handle.read()).group(1)
+
+
+def import_plugin():
+    sys.modules.pop('resources.lib.plugin', None)
+    from resources.lib import plugin
+    return plugin
+
+
+def routes(plugin, base_url):
+    """
+    :return: list of tuples (route name, function calling route)
+    """
+    series_id, slug, _ = corpus.series()[0]
+    series = corpus.series_url(series_id, slug)
+    season = corpus.season_url(series_id, slug, 1)
+    movie_id, title = corpus.MOVIES[0][0:2]
+    movie = corpus.movie_url(base_url, movie_id, title)
+
+    return [
+        ('index', lambda: plugin.index()),
+        ('show_tv_series_list', lambda: plugin.show_tv_series_list()),
+        ('show_tv_series_letter', lambda: plugin.show_tv_series_letter('S')),
+        ('show_tv_series_seasons_list', lambda: plugin.show_tv_series_seasons_list(plugin.ids.id_for(series))),
+        ('show_tv_series_episodes_list', lambda: plugin.show_tv_series_episodes_list(plugin.ids.id_for(season))),
+        ('show_movies_list', lambda: plugin.show_movies_list(plugin.ids.id_for('/gatunek/25'))),
+        ('show_latest_movies', lambda: plugin.show_movies_section_list('latest')),
+        ('show_search', lambda: plugin.show_search()),
+        ('play_movie', lambda: plugin.play_movie(plugin.ids.id_for(movie))),
+    ]
+
+
+def invoke(call, start):
+    """
+    Call route and measure time until directory is finished or stream is resolved.
+
+    :param start: float - time when invocation started
+    :return: float | None - seconds or None when route failed
+    """
+    call()
+
+    failed = [event for event in kodi.events if event[1] == 'notification' and 'red' in event[2]['heading']]
+    done = kodi.last_event('endOfDirectory', 'setResolvedUrl')
+    if failed or not done or not done[2]['succeeded']:
+        return None
+
+    return done[0] - start
+
+
+def percentile(samples, rank):
+    """
+    Nearest-rank percentile.
+    """
+    return samples[max(0, int(math.ceil(rank / 100.0 * len(samples))) - 1)]
+
+
+def summary(samples, errors):
+    samples = sorted(samples)
+    if not samples:
+        return {'runs': 0, 'errors': errors}
+
+    return {
+        'runs': len(samples),
+        'errors': errors,
+        'min': round(samples[0] * 1000, 2),
+        'p50': round(percentile(samples, 50) * 1000, 2),
+        'p95': round(percentile(samples, 95) * 1000, 2),
+        'p99': round(percentile(samples, 99) * 1000, 2),
+        'max': round(samples[-1] * 1000, 2),
+    }
+
+
+def run(runs, latency, cold):
+    """
+    Drive plugin routes against local stand-in.
+
+    :param runs: int - number of invocations of every route
+    :param latency: float - network latency injected by stand-in in seconds
+    :param cold: bool - import plugin module again before every invocation and include it in measured time
+    :return: dict - latency percentiles in milliseconds per route
+    """
+    profile = tempfile.mkdtemp()
+    kodi.install(profile)
+    kodi.state['settings'] = dict(SETTINGS)
+    kodi.state['input'] = 'futurama'
+
+    try:
+        with FixtureServer(latency=latency) as server:
+            zalukaj.URL = server.url
+            results = {}
+            for name, _ in routes(import_plugin(), server.url):
+                samples, errors = [], 0
+                for _ in range(runs):
+                    del kodi.events[:]
+                    start = time.time()
+                    plugin = import_plugin() if cold else sys.modules['resources.lib.plugin']
+                    elapsed = invoke(dict(routes(plugin, server.url))[name], start)
+                    if elapsed is None:
+                        errors += 1
+                    else:
+                        samples.append(elapsed)
+
+                results[name] = summary(samples, errors)
+    finally:
+        shutil.rmtree(profile)
+
+    return {'version': addon_version(), 'runs': runs, 'latency': latency, 'cold': cold, 'unit': 'ms',
+            'routes': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure time from plugin route invocation to endOfDirectory or "
+                                                 "setResolvedUrl using fake Kodi modules and local stand-in.")
+    parser.add_argument("--runs", type=int, default=50, help="number of invocations of every route")
+    parser.add_argument("--latency", type=float, default=0.02, help="injected network latency in seconds")
+    parser.add_argument("--cold", action="store_true", help="import plugin module before every invocation")
+    parser.add_argument("--output", help="write json report to file instead of standard output")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args.runs, args.latency, args.cold), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(report + "\n")
+    else:
+        print(report)